@@ -0,0 +1,197 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    # Windows - bez pomiaru szczytowego zużycia pamięci
+    resource = None
+
+from synthetic_data import generate_pages, generate_sources
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+STAGES = ["merger", "parser", "creator"]
+MERGED_FILE = "merged_books_final.csv"
+
+
+def _peak_rss_mb():
+    # Maksimum dla procesu i jego potomków (pula procesów DBMerger); ru_maxrss to KB na Linuksie i bajty na macOS
+    if resource is None:
+        return None
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak / scale, 1)
+
+
+def _use_tool(name):
+    # Każde narzędzie ma własne main.py i normalization.py - etap działa w osobnym procesie z katalogiem narzędzia na ścieżce
+    sys.path.insert(0, os.path.join(ROOT, name))
+
+
+def _count_lines(path):
+    with open(path, "rb") as f:
+        return sum(1 for _ in f) - 1
+
+
+def run_merger(data_dir, options):
+    _use_tool("DBMerger")
+    from main import merge_books
+
+    # DBMerger czyta ścieżki ../databases/... względem katalogu roboczego
+    work_dir = os.path.join(data_dir, "work")
+    os.makedirs(work_dir, exist_ok=True)
+    os.chdir(work_dir)
+    with open(os.path.join(data_dir, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    output_file = os.path.join(data_dir, "databases", MERGED_FILE)
+    started = time.perf_counter()
+    merge_books(output_file, chunksize=options.get("chunksize"), workers=options.get("workers"))
+    elapsed = time.perf_counter() - started
+    rows = sum(manifest["sources"].values()) + manifest["ratings"]
+    return {"rows": rows, "seconds": elapsed, "output_rows": _count_lines(output_file)}
+
+
+def run_parser(data_dir, options):
+    _use_tool("DBScraper")
+    from page_parser import BookPageParser
+
+    pages_dir = os.path.join(data_dir, "pages")
+    with open(os.path.join(pages_dir, "expected.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages.append((os.path.basename(path)[:-5], f.read()))
+
+    parser = BookPageParser(options.get("backend", "auto"))
+    started = time.perf_counter()
+    results = [(isbn, parser.parse(html)) for isbn, html in pages]
+    elapsed = time.perf_counter() - started
+    # Niezgodność z oczekiwanymi polami oznacza zmianę parsera albo generatora stron
+    mismatches = sum(1 for isbn, details in results if details != expected[isbn])
+    return {"rows": len(pages), "seconds": elapsed, "backend": parser.backend, "mismatches": mismatches}
+
+
+def run_creator(data_dir, options):
+    _use_tool("DBCreator")
+    from main import Neo4jBooksImporter
+    from memory_graph import InMemoryGraph
+
+    # Sterownik zastępczy - graf w pamięci zamiast serwera Neo4j, mierzony jest koszt importera
+    graph = InMemoryGraph()
+    importer = Neo4jBooksImporter(None, None, None, driver=graph.driver())
+    csv_file = os.path.join(data_dir, "databases", MERGED_FILE)
+    started = time.perf_counter()
+    importer.import_books(csv_file, batch_size=options.get("batch_size", 1000), workers=options.get("import_workers"))
+    elapsed = time.perf_counter() - started
+    return {"rows": _count_lines(csv_file), "seconds": elapsed, "nodes": graph.node_count(),
+            "relationships": graph.relationship_count()}
+
+
+STAGE_RUNNERS = {"merger": run_merger, "parser": run_parser, "creator": run_creator}
+
+
+def run_stage(stage, data_dir, options):
+    # Wywoływane w procesie potomnym: wypisy narzędzia idą do stderr, na stdout trafia tylko wynik JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        result = STAGE_RUNNERS[stage](data_dir, options)
+    result["rows_per_second"] = round(result["rows"] / result["seconds"], 1) if result["seconds"] > 0 else None
+    result["seconds"] = round(result["seconds"], 3)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    print(json.dumps(result))
+
+
+def _spawn_stage(stage, data_dir, options, verbose):
+    command = [sys.executable, os.path.abspath(__file__), "--run-stage", stage, "--data-dir", data_dir,
+               "--options", json.dumps(options)]
+    completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=None if verbose else subprocess.DEVNULL,
+                               text=True)
+    if completed.returncode != 0:
+        return {"error": f"kod wyjścia {completed.returncode}"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_suite(scales, stages, work_dir, options, pages=None, seed=0, verbose=False, keep_data=False):
+    results = []
+    for scale in scales:
+        data_dir = os.path.join(work_dir, f"scale_{scale}")
+        started = time.perf_counter()
+        manifest = generate_sources(data_dir, scale, seed)
+        page_count = generate_pages(data_dir, pages or min(scale, 2000), seed) if "parser" in stages else 0
+        print(f"Dane syntetyczne dla {scale} wierszy w {time.perf_counter() - started:.1f} s "
+              f"(strony: {page_count}, błędne wiersze: {sum(manifest['bad_lines'].values())})", file=sys.stderr)
+
+        for stage in STAGES:
+            # Import potrzebuje pliku scalonego, więc DBMerger uruchamiany jest także wtedy, gdy nie jest mierzony
+            needed = stage == "merger" and "creator" in stages
+            if stage not in stages and not needed:
+                continue
+            result = _spawn_stage(stage, data_dir, options, verbose)
+            if stage in stages:
+                results.append(dict(result, stage=stage, scale=scale))
+                print(f"{stage} @ {scale}: {result}", file=sys.stderr)
+
+        if not keep_data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    curves = {stage: [[result["scale"], result.get("rows_per_second"), result.get("peak_rss_mb")]
+                      for result in results if result["stage"] == stage] for stage in stages}
+    return {
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpu_count": os.cpu_count()},
+        "options": options,
+        "results": results,
+        # Krzywe skalowania: [liczba wierszy, wiersze/s, szczytowa pamięć MB]
+        "curves": curves
+    }
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Benchmark DBMerger, parsera DBScraper i importu DBCreator "
+                                                          "na danych syntetycznych")
+    argument_parser.add_argument('--scales', type=int, nargs='+', default=[10000, 100000])
+    argument_parser.add_argument('--stages', default=','.join(STAGES))
+    argument_parser.add_argument('--pages', type=int, help="liczba stron HTML (domyślnie min(skala, 2000))")
+    argument_parser.add_argument('--seed', type=int, default=0)
+    argument_parser.add_argument('--chunksize', type=int, help="tryb strumieniowy DBMerger")
+    argument_parser.add_argument('--workers', type=int, help="procesy wczytujące źródła DBMerger")
+    argument_parser.add_argument('--batch-size', type=int, default=1000, help="paczka importu DBCreator")
+    argument_parser.add_argument('--import-workers', type=int, help="wątki importu DBCreator")
+    argument_parser.add_argument('--backend', default='auto', help="backend parsera stron")
+    argument_parser.add_argument('--work-dir', help="katalog na dane (domyślnie tymczasowy)")
+    argument_parser.add_argument('--keep-data', action='store_true')
+    argument_parser.add_argument('--output', help="plik raportu JSON (domyślnie stdout)")
+    argument_parser.add_argument('--verbose', action='store_true', help="wypisy narzędzi na stderr")
+    argument_parser.add_argument('--run-stage', choices=STAGES, help=argparse.SUPPRESS)
+    argument_parser.add_argument('--data-dir', help=argparse.SUPPRESS)
+    argument_parser.add_argument('--options', default='{}', help=argparse.SUPPRESS)
+    args = argument_parser.parse_args()
+
+    if args.run_stage:
+        run_stage(args.run_stage, args.data_dir, json.loads(args.options))
+        sys.exit(0)
+
+    stage_options = {"chunksize": args.chunksize, "workers": args.workers, "batch_size": args.batch_size,
+                     "import_workers": args.import_workers, "backend": args.backend}
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="dbbenchmark_")
+    report = run_suite(args.scales, args.stages.split(','), work_dir, stage_options, args.pages, args.seed,
+                       args.verbose, args.keep_data)
+    if not args.work_dir and not args.keep_data:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
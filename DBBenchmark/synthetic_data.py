@@ -0,0 +1,279 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Słowa do budowania tytułów i nazwisk; nazwiska z polskimi znakami trafiają tylko do db3 (UTF-8),
+# bo pozostałe źródła są zapisywane w ISO-8859-1
+ADJECTIVES = ["Silent", "Broken", "Hidden", "Last", "Golden", "Dark", "Lost", "Burning", "Winter", "Secret",
+              "Little", "Endless", "Crimson", "Forgotten", "Wild", "Quiet"]
+NOUNS = ["Garden", "River", "Empire", "Letters", "House", "Kingdom", "Voyage", "Witness", "Mountain", "Promise",
+         "Children", "Shadow", "Night", "Machine", "Island", "Song"]
+PLACES = ["Avalon", "Kraków", "Lisbon", "the North", "the Sea", "Berlin", "Mars", "Dublin", "Zürich", "Sevilla"]
+FIRST_NAMES = ["Anna", "John", "Maria", "Peter", "José", "Helen", "Jürgen", "Claire", "Tomas", "Amélie", "Neil", "Ursula"]
+LAST_NAMES = ["Smith", "Kowalski", "García", "Müller", "Dubois", "Rossi", "Novak", "Jensen", "O'Brien", "Lindqvist",
+              "Herbert", "Pratchett", "Le Guin", "Andersen"]
+UTF8_LAST_NAMES = ["Łukasiewicz", "Żeromski", "Dvořák"]
+PUBLISHERS = ["Penguin", "Vintage", "Ace", "Tor", "Scholastic", "HarperCollins", "Znak", "Bantam", "Orbit", "Gallimard"]
+LANGUAGE_CODES = ["eng", "eng", "eng", "en-US", "en-GB", "spa", "fre", "ger", "ita", "jpn", "por", "xx"]
+LANGUAGE_NAMES = ["English", "Spanish", "French", "German", "Polish", "Italian"]
+CATEGORIES = ["Fiction", "History", "Science", "Poetry", "Fantasy", "Biography", "Juvenile Fiction", "Drama"]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+          "November", "December"]
+
+# Udział źródeł w liczbie wierszy i odsetki zjawisk z prawdziwych danych
+SOURCE_SHARES = {"db3": 0.2, "db1": 0.6, "db2": 0.2}
+UNIQUE_BOOKS = 0.8          # część wierszy opisuje książki obecne także w innym źródle
+EDITION_RATE = 0.02         # inne wydanie (nowy ISBN) tej samej książki
+MISSING_RATE = 0.05
+BAD_LINE_RATE = 0.001
+RATINGS_PER_BOOK = 2
+
+
+def _choice(rng, values, size):
+    return np.array(values, dtype=object)[rng.integers(0, len(values), size)]
+
+
+def isbn10(bodies):
+    # Dziewięć cyfr treści (liczby całkowite) -> ISBN-10 z poprawną cyfrą kontrolną
+    digits = (bodies[:, None] // 10 ** np.arange(8, -1, -1)) % 10
+    check = (11 - (digits @ np.arange(10, 1, -1)) % 11) % 11
+    check = np.where(check == 10, "X", check.astype(str))
+    return pd.Series(bodies).astype(str).str.zfill(9) + check
+
+
+def isbn13(bodies):
+    digits = (bodies[:, None] // 10 ** np.arange(8, -1, -1)) % 10
+    weighted = 9 * 1 + 7 * 3 + 8 * 1 + digits @ np.array([3, 1, 3, 1, 3, 1, 3, 1, 3])
+    check = ((10 - weighted % 10) % 10).astype(str)
+    return "978" + pd.Series(bodies).astype(str).str.zfill(9) + check
+
+
+class _Catalogue:
+    # Wspólna pula książek - źródła losują z niej wiersze, więc część ISBN powtarza się między plikami
+    def __init__(self, size, rng):
+        self.size = size
+        self.bodies = rng.choice(10 ** 9, size, replace=False)
+        self.titles = (_choice(rng, ADJECTIVES, size) + " " + _choice(rng, NOUNS, size) + " of "
+                       + _choice(rng, PLACES, size) + " " + pd.Series(np.arange(size)).astype(str).to_numpy(dtype=object))
+        self.authors = _choice(rng, FIRST_NAMES, size) + " " + _choice(rng, LAST_NAMES, size)
+        second = rng.random(size) < 0.2
+        self.authors[second] = (self.authors[second] + "/" + _choice(rng, FIRST_NAMES, second.sum()) + " "
+                                + _choice(rng, LAST_NAMES, second.sum()))
+        self.publishers = _choice(rng, PUBLISHERS, size)
+        self.years = rng.integers(1900, 2024, size)
+        self.pages = rng.integers(40, 1200, size)
+        self.ratings = np.round(rng.uniform(1, 5, size), 2)
+
+    def sample(self, rng, rows):
+        books = rng.integers(0, self.size, rows)
+        bodies = self.bodies[books].copy()
+        # Inne wydanie: nowy ISBN, ten sam tytuł i autor
+        editions = rng.random(rows) < EDITION_RATE
+        bodies[editions] = rng.integers(0, 10 ** 9, editions.sum())
+        return books, bodies
+
+
+def _missing(rng, values, rate=MISSING_RATE):
+    values = pd.Series(values, dtype=object)
+    values[rng.random(len(values)) < rate] = np.nan
+    return values
+
+
+def _isbn_variants(rng, bodies, hyphen_rate=0.0, isbn13_rate=0.0, unpadded_rate=0.0):
+    # Ten sam ISBN w różnych zapisach: z myślnikami, jako ISBN-13, bez zer z przodu
+    isbns = isbn10(bodies)
+    hyphens = rng.random(len(isbns)) < hyphen_rate
+    isbns[hyphens] = (isbns[hyphens].str[:1] + "-" + isbns[hyphens].str[1:4] + "-" + isbns[hyphens].str[4:9]
+                      + "-" + isbns[hyphens].str[9:])
+    long_form = rng.random(len(isbns)) < isbn13_rate
+    isbns[long_form] = isbn13(bodies[long_form]).to_numpy()
+    unpadded = rng.random(len(isbns)) < unpadded_rate
+    isbns[unpadded] = isbns[unpadded].str.lstrip("0")
+    return isbns
+
+
+def _write_csv(df, path, encoding, sep=",", rng=None, chunk_rows=200000, quoting=None):
+    # Zapis paczkami; do części wierszy dopisywane są nadmiarowe pola (wiersze odrzucane przez on_bad_lines='skip')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    bad_lines = 0
+    with open(path, "w", encoding=encoding, errors="replace", newline="") as f:
+        for start in range(0, len(df), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            text = chunk.to_csv(index=False, header=start == 0, sep=sep, quoting=quoting, lineterminator="\n")
+            lines = text.split("\n")
+            offset = 1 if start == 0 else 0
+            if rng is not None:
+                for position in np.flatnonzero(rng.random(len(chunk)) < BAD_LINE_RATE):
+                    lines[position + offset] += f"{sep}extra{sep}field"
+                    bad_lines += 1
+            f.write("\n".join(lines))
+    return bad_lines
+
+
+def generate_sources(output_dir, rows, seed=0):
+    # Pliki w układzie ../databases/db1, db2, db3 oczekiwanym przez DBMerger; zwraca manifest z liczbami wierszy
+    rng = np.random.default_rng(seed)
+    databases = os.path.join(output_dir, "databases")
+    catalogue = _Catalogue(max(1, int(rows * UNIQUE_BOOKS)), rng)
+    counts = {name: max(1, int(rows * share)) for name, share in SOURCE_SHARES.items()}
+    manifest = {"rows": rows, "seed": seed, "sources": counts, "bad_lines": {}}
+
+    # db3 - Goodreads (UTF-8, daty m/d/Y, kody języków)
+    books, bodies = catalogue.sample(rng, counts["db3"])
+    authors = catalogue.authors[books].copy()
+    utf8 = rng.random(len(books)) < 0.05
+    authors[utf8] = _choice(rng, FIRST_NAMES, utf8.sum()) + " " + _choice(rng, UTF8_LAST_NAMES, utf8.sum())
+    isbns = _isbn_variants(rng, bodies, unpadded_rate=0.02)
+    dates = (pd.Series(rng.integers(1, 13, len(books))).astype(str) + "/" + pd.Series(rng.integers(1, 29, len(books))).astype(str)
+             + "/" + pd.Series(catalogue.years[books]).astype(str))
+    db3 = pd.DataFrame({
+        "bookID": np.arange(len(books)),
+        "title": catalogue.titles[books],
+        "authors": authors,
+        "average_rating": catalogue.ratings[books],
+        "isbn": isbns,
+        "isbn13": isbn13(bodies),
+        "language_code": _missing(rng, _choice(rng, LANGUAGE_CODES, len(books))),
+        "num_pages": _missing(rng, catalogue.pages[books]),
+        "ratings_count": rng.integers(0, 100000, len(books)),
+        "text_reviews_count": rng.integers(0, 5000, len(books)),
+        "publication_date": dates.where(rng.random(len(books)) > 0.005, "11/31/2000"),
+        "publisher": _missing(rng, catalogue.publishers[books])
+    })
+    manifest["bad_lines"]["db3"] = _write_csv(db3, os.path.join(databases, "db3", "books.csv"), "utf-8", rng=rng)
+
+    # db1 - Book-Crossing (ISO-8859-1, średniki, wszystkie pola w cudzysłowach)
+    books, bodies = catalogue.sample(rng, counts["db1"])
+    isbns = _isbn_variants(rng, bodies, hyphen_rate=0.03, isbn13_rate=0.01)
+    db1_isbns = isbns
+    db1 = pd.DataFrame({
+        "ISBN": isbns,
+        "Book-Title": catalogue.titles[books],
+        "Book-Author": _missing(rng, pd.Series(catalogue.authors[books]).str.replace("/", ", ", regex=False).to_numpy()),
+        "Year-Of-Publication": pd.Series(catalogue.years[books]).astype(str).where(rng.random(len(books)) > 0.01, "0"),
+        "Publisher": _missing(rng, catalogue.publishers[books]),
+        "Image-URL-S": "http://images.example.com/" + isbns + ".jpg"
+    })
+    manifest["bad_lines"]["db1"] = _write_csv(db1, os.path.join(databases, "db1", "books.csv"), "ISO-8859-1", sep=";",
+                                              rng=rng, quoting=1)
+
+    # Oceny db1 - część dotyczy ISBN spoza katalogu, część zapisana z myślnikami
+    rating_rows = counts["db1"] * RATINGS_PER_BOOK
+    rated = db1_isbns.to_numpy(dtype=object)[rng.integers(0, len(db1_isbns), rating_rows)]
+    unknown = rng.random(rating_rows) < 0.05
+    rated[unknown] = isbn10(rng.integers(0, 10 ** 9, unknown.sum())).to_numpy()
+    ratings = pd.DataFrame({
+        "User-ID": rng.integers(1, max(2, rating_rows // 5), rating_rows),
+        "ISBN": rated,
+        "Book-Rating": rng.integers(0, 11, rating_rows)
+    })
+    manifest["ratings"] = rating_rows
+    manifest["bad_lines"]["ratings"] = _write_csv(ratings, os.path.join(databases, "db1", "ratings.csv"), "ISO-8859-1",
+                                                  sep=";", rng=rng, quoting=1)
+
+    # db2 - Google Books (ISO-8859-1, podtytuły, kategorie)
+    books, bodies = catalogue.sample(rng, counts["db2"])
+    db2 = pd.DataFrame({
+        "isbn13": isbn13(bodies),
+        "isbn10": _isbn_variants(rng, bodies, isbn13_rate=0.03),
+        "title": catalogue.titles[books],
+        "subtitle": _missing(rng, _choice(rng, ["A Novel", "Stories", "Collected Edition"], len(books)), 0.8),
+        "authors": _missing(rng, pd.Series(catalogue.authors[books]).str.replace("/", ";", regex=False).to_numpy()),
+        "categories": _missing(rng, _choice(rng, CATEGORIES, len(books)), 0.2),
+        "thumbnail": "",
+        "description": _missing(rng, _choice(rng, ["A story about loss.", "An epic, \"unputdownable\" saga."], len(books))),
+        "published_year": catalogue.years[books],
+        "average_rating": _missing(rng, catalogue.ratings[books]),
+        "num_pages": _missing(rng, catalogue.pages[books]),
+        "ratings_count": rng.integers(0, 5000, len(books))
+    })
+    manifest["bad_lines"]["db2"] = _write_csv(db2, os.path.join(databases, "db2", "books.csv"), "ISO-8859-1", rng=rng)
+
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{title} by {author} | Goodreads</title>
+<script type="application/ld+json">{json_ld}</script></head>
+<body><div id="__next"><main class="PageFrame PageFrame--siteHeaderBanner"><div class="BookPage__gridContainer">
+<div class="BookPage__leftColumn"><img class="ResponsiveImage" src="https://images.example.com/{isbn}.jpg" alt="{title}"></div>
+<div class="BookPage__rightColumn"><div class="BookPageTitleSection"><h1 class="Text Text__title1" data-testid="bookTitle">{title}</h1></div>
+<div class="BookPageMetadataSection"><div class="BookPageMetadataSection__contributor"><h3 class="Text Text__title3">
+<span class="ContributorLinksList">{contributors}</span></h3></div>
+{rating}
+<div class="BookPageMetadataSection__description"><div class="TruncatedContent"><div class="TruncatedContent__text">{description}</div></div></div>
+<div class="BookPageMetadataSection__genres"><ul class="CollapsableList">{genres}</ul></div>
+<div class="FeaturedDetails">{pages}{publication}</div>
+<div class="EditionDetails"><dl>
+<div class="DescListItem"><dt>Format</dt><dd><div class="TruncatedContent__text">Paperback</div></dd></div>
+<div class="DescListItem"><dt>ISBN</dt><dd><div class="TruncatedContent__text">{isbn}</div></dd></div>
+{language}
+</dl></div></div>
+<div class="ReviewsList">{reviews}</div>
+</div></div></main></div></body></html>
+"""
+
+
+def _page(rng, isbn, book):
+    contributors = "".join(
+        f'<a class="ContributorLink" href="/author/show/{position}"><span class="ContributorLink__name" data-testid="name">'
+        f'{name}</span></a>' for position, name in enumerate(book["authors"]))
+    genres = "".join(
+        f'<span class="BookPageMetadataSection__genreButton"><a class="Button Button--tag Button--medium" href="/genres/x">'
+        f'<span class="Button__labelItem">{genre}</span></a></span>' for genre in book["genres"])
+    rating = (f'<div class="RatingStatistics__rating" aria-hidden="true">{book["rating_goodreads"]}</div>'
+              if book["rating_goodreads"] else "")
+    pages = f'<p data-testid="pagesFormat">{book["num_pages"]} pages, Paperback</p>' if book["num_pages"] else ""
+    publication = (f'<p data-testid="publicationInfo">First published {rng.choice(MONTHS)} {rng.integers(1, 29)}, '
+                   f'{book["publication_date"]} by {book["publisher"]}</p>') if book["publication_date"] else ""
+    language = (f'<div class="DescListItem"><dt>Language</dt><dd><div class="TruncatedContent">'
+                f'<div class="TruncatedContent__text">{book["language"]}</div></div></dd></div>') if book["language"] else ""
+    # Recenzje i dane JSON-LD zwiększają stronę do rozmiaru zbliżonego do prawdziwej
+    reviews = "".join(
+        f'<article class="ReviewCard"><section class="ReviewText"><span class="Formatted">'
+        f'{" ".join(rng.choice(NOUNS, 60))}</span></section></article>' for _ in range(int(rng.integers(5, 30))))
+    json_ld = json.dumps({"@type": "Book", "name": book["title"], "isbn": isbn, "numberOfPages": book["num_pages"]})
+    return PAGE_TEMPLATE.format(title=book["title"], author=book["authors"][0], isbn=isbn, json_ld=json_ld,
+                                contributors=contributors, rating=rating, genres=genres, pages=pages,
+                                publication=publication, language=language, reviews=reviews,
+                                description=" ".join(rng.choice(ADJECTIVES, 80)))
+
+
+def generate_pages(output_dir, pages, seed=0):
+    # Strony w układzie Goodreads (te same klasy i atrybuty, które czyta page_parser.py) oraz oczekiwane wyniki
+    # parsowania w expected.json; brakujące pola występują z częstością MISSING_RATE
+    rng = np.random.default_rng(seed)
+    pages_dir = os.path.join(output_dir, "pages")
+    os.makedirs(pages_dir, exist_ok=True)
+    expected = {}
+    for isbn in isbn10(rng.choice(10 ** 9, pages, replace=False)):
+        present = rng.random(6) > MISSING_RATE
+        authors = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(int(rng.integers(1, 3)))]
+        book = {
+            "title": f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}",
+            "authors": authors,
+            "genres": list(rng.choice(CATEGORIES, int(rng.integers(0, 4)), replace=False)),
+            "rating_goodreads": f"{rng.uniform(1, 5):.2f}" if present[0] else None,
+            "num_pages": int(rng.integers(40, 1200)) if present[1] else None,
+            "publication_date": int(rng.integers(1900, 2024)) if present[2] else None,
+            "publisher": str(rng.choice(PUBLISHERS)),
+            "language": str(rng.choice(LANGUAGE_NAMES)) if present[3] else None
+        }
+        with open(os.path.join(pages_dir, f"{isbn}.html"), "w", encoding="utf-8") as f:
+            f.write(_page(rng, isbn, book))
+        expected[isbn] = {
+            "rating_goodreads": book["rating_goodreads"],
+            "authors": ", ".join(authors),
+            "category": ", ".join(book["genres"]),
+            "num_pages": book["num_pages"],
+            "publication_date": book["publication_date"],
+            "publisher": book["publisher"] if book["publication_date"] else None,
+            "language": book["language"]
+        }
+    with open(os.path.join(pages_dir, "expected.json"), "w", encoding="utf-8") as f:
+        json.dump(expected, f, ensure_ascii=False)
+    return len(expected)
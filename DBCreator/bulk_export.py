@@ -0,0 +1,167 @@
+import csv
+import os
+import sys
+import time
+
+from normalization import normalize_frame
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from book_schema import BOOK_COLUMNS, is_columnar, iter_books
+
+# Nagłówki w formacie `neo4j-admin database import`. Klucze naturalne (ISBN, nazwa)
+# są identyfikatorami w osobnych przestrzeniach ID, więc ID są deterministyczne
+NODE_HEADERS = {
+    "Book": ["isbn:ID(Book)", "title", "num_pages:int", "publication_year:int",
+             "rating_goodreads:float", "rating_amazon:float", "rating_google:float", ":LABEL"],
+    "Author": ["name:ID(Author)", ":LABEL"],
+    "Publisher": ["name:ID(Publisher)", ":LABEL"],
+    "Language": ["name:ID(Language)", ":LABEL"],
+    "Genre": ["name:ID(Genre)", ":LABEL"]
+}
+
+RELATIONSHIP_HEADERS = {
+    "WRITTEN_BY": [":START_ID(Book)", ":END_ID(Author)", ":TYPE"],
+    "PUBLISHED_BY": [":START_ID(Book)", ":END_ID(Publisher)", ":TYPE"],
+    "WRITTEN_IN": [":START_ID(Book)", ":END_ID(Language)", ":TYPE"],
+    "BELONGS_TO": [":START_ID(Book)", ":END_ID(Genre)", ":TYPE"]
+}
+
+
+class _ChunkedCsvWriter:
+    def __init__(self, output_dir, name, header, rows_per_file):
+        self.output_dir = output_dir
+        self.name = name
+        self.rows_per_file = rows_per_file
+        self.files = []
+        self.rows_written = 0
+        self._file = None
+        self._writer = None
+        self._rows_in_file = 0
+
+        header_path = os.path.join(output_dir, f"{name}_header.csv")
+        with open(header_path, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow(header)
+        self.header_path = header_path
+
+    def write(self, row):
+        if self._writer is None or self._rows_in_file >= self.rows_per_file:
+            self._rotate()
+        self._writer.writerow(row)
+        self._rows_in_file += 1
+        self.rows_written += 1
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        path = os.path.join(self.output_dir, f"{self.name}_part{len(self.files) + 1:04d}.csv")
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._rows_in_file = 0
+        self.files.append(path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def import_argument(self):
+        return ",".join([self.header_path] + self.files)
+
+
+class AdminImportExporter:
+    def __init__(self, output_dir, chunk_size=50000, rows_per_file=1000000):
+        self.output_dir = output_dir
+        self.chunk_size = chunk_size
+        self.rows_per_file = rows_per_file
+
+    def export(self, csv_file):
+        os.makedirs(self.output_dir, exist_ok=True)
+        started = time.perf_counter()
+
+        nodes = {label: _ChunkedCsvWriter(self.output_dir, label.lower(), header, self.rows_per_file)
+                 for label, header in NODE_HEADERS.items()}
+        relationships = {rel_type: _ChunkedCsvWriter(self.output_dir, rel_type.lower(), header, self.rows_per_file)
+                         for rel_type, header in RELATIONSHIP_HEADERS.items()}
+
+        # Zbiory kluczy do deduplikacji - w pamięci są tylko klucze węzłów, nie wiersze
+        seen_nodes = {label: set() for label in NODE_HEADERS}
+
+        total_rows = 0
+        duplicate_count = 0
+        try:
+            # ISBN jako tekst - inaczej typ kolumny zależałby od zawartości danej paczki;
+            # z plików kolumnowych wczytywane są tylko kolumny katalogu
+            columns = BOOK_COLUMNS if is_columnar(csv_file) else None
+            for chunk in iter_books(csv_file, self.chunk_size, columns=columns, encoding='utf-8'):
+                missing_columns = [col for col in ['isbn', 'title'] if col not in chunk.columns]
+                if missing_columns:
+                    raise ValueError(f"Brakujące wymagane kolumny w pliku CSV: {', '.join(missing_columns)}")
+
+                for book in normalize_frame(chunk):
+                    if not self._write_book(book, nodes, relationships, seen_nodes):
+                        duplicate_count += 1
+
+                total_rows += len(chunk)
+                print(f"Przetworzono {total_rows} wierszy ({time.perf_counter() - started:.2f} s)")
+        finally:
+            for writer in list(nodes.values()) + list(relationships.values()):
+                writer.close()
+
+        for label, writer in nodes.items():
+            print(f"Węzły {label}: {writer.rows_written}")
+        for rel_type, writer in relationships.items():
+            print(f"Relacje {rel_type}: {writer.rows_written}")
+        if duplicate_count > 0:
+            print(f"Pominięto {duplicate_count} powtórzonych ISBN")
+
+        command = self.import_command(nodes, relationships)
+        print("Polecenie importu:")
+        print(command)
+        return command
+
+    def _write_book(self, book, nodes, relationships, seen_nodes):
+        isbn = book["isbn"]
+        # Pierwsze wystąpienie ISBN wygrywa razem z relacjami - neo4j-admin nie dopuszcza
+        # powtórzonych ID, a pamiętanie wszystkich par relacji rosłoby z rozmiarem danych
+        if isbn in seen_nodes["Book"]:
+            return False
+        seen_nodes["Book"].add(isbn)
+        nodes["Book"].write([
+            isbn, book["title"], book["num_pages"], _empty_if_none(book["year"]),
+            _empty_if_none(book["rating_goodreads"]), _empty_if_none(book["rating_amazon"]),
+            _empty_if_none(book["rating_google"]), "Book"
+        ])
+
+        targets = [("Publisher", "PUBLISHED_BY", [book["publisher"]] if book["publisher"] else []),
+                   ("Language", "WRITTEN_IN", [book["language"]] if book["language"] else []),
+                   ("Author", "WRITTEN_BY", book["authors"]),
+                   ("Genre", "BELONGS_TO", book["genres"])]
+
+        for label, rel_type, names in targets:
+            # dict.fromkeys usuwa powtórzenia w obrębie wiersza z zachowaniem kolejności
+            for name in dict.fromkeys(names):
+                if name not in seen_nodes[label]:
+                    seen_nodes[label].add(name)
+                    nodes[label].write([name, label])
+                relationships[rel_type].write([isbn, name, rel_type])
+        return True
+
+    def import_command(self, nodes, relationships):
+        parts = ["neo4j-admin database import full neo4j --overwrite-destination --multiline-fields=true"]
+        for label, writer in nodes.items():
+            if writer.files:
+                parts.append(f"--nodes={label}={writer.import_argument()}")
+        for rel_type, writer in relationships.items():
+            if writer.files:
+                parts.append(f"--relationships={rel_type}={writer.import_argument()}")
+        return " \\\n    ".join(parts)
+
+
+def _empty_if_none(value):
+    return '' if value is None else value
+
+
+# Usage example
+if __name__ == "__main__":
+    exporter = AdminImportExporter("../databases/neo4j_import")
+    exporter.export("../databases/Books1KPlus.csv")
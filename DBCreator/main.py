@@ -1,17 +1,192 @@
-import pandas as pd
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
 from neo4j import GraphDatabase
+from neo4j.exceptions import TransientError
+
+from normalization import normalize_frame
+from state_store import ImportStateStore, book_hash
+
+# Wspólny schemat katalogu (book_schema.py) leży w katalogu głównym projektu
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from book_schema import BOOK_COLUMNS, is_columnar, read_books
+from instrumentation import metrics
+
+# Zapytania trybu wsadowego - każde przetwarza całą paczkę wierszy przez UNWIND
+BATCH_BOOK_QUERY = """
+UNWIND $rows AS row
+MERGE (b:Book {isbn: row.isbn})
+SET b.title = row.title,
+    b.num_pages = row.num_pages,
+    b.publication_year = coalesce(row.year, b.publication_year),
+    b.rating_goodreads = coalesce(row.rating_goodreads, b.rating_goodreads),
+    b.rating_amazon = coalesce(row.rating_amazon, b.rating_amazon),
+    b.rating_google = coalesce(row.rating_google, b.rating_google)
+"""
+
+BATCH_PUBLISHER_QUERY = """
+UNWIND $rows AS row
+MERGE (p:Publisher {name: row.name})
+WITH p, row
+MATCH (b:Book {isbn: row.isbn})
+MERGE (b)-[:PUBLISHED_BY]->(p)
+"""
+
+BATCH_LANGUAGE_QUERY = """
+UNWIND $rows AS row
+MERGE (l:Language {name: row.name})
+WITH l, row
+MATCH (b:Book {isbn: row.isbn})
+MERGE (b)-[:WRITTEN_IN]->(l)
+"""
+
+BATCH_AUTHOR_QUERY = """
+UNWIND $rows AS row
+MERGE (a:Author {name: row.name})
+WITH a, row
+MATCH (b:Book {isbn: row.isbn})
+MERGE (b)-[:WRITTEN_BY]->(a)
+"""
+
+BATCH_GENRE_QUERY = """
+UNWIND $rows AS row
+MERGE (g:Genre {name: row.name})
+WITH g, row
+MATCH (b:Book {isbn: row.isbn})
+MERGE (b)-[:BELONGS_TO]->(g)
+"""
+
+# Zapytania trybu przyrostowego - zmieniona książka traci stare relacje i opcjonalne
+# właściwości, zanim zostanie zapisana na nowo
+RESET_BOOK_QUERY = """
+UNWIND $isbns AS isbn
+MATCH (b:Book {isbn: isbn})
+REMOVE b.publication_year, b.rating_goodreads, b.rating_amazon, b.rating_google
+WITH b
+OPTIONAL MATCH (b)-[r:WRITTEN_BY|PUBLISHED_BY|WRITTEN_IN|BELONGS_TO]->()
+DELETE r
+"""
+
+DETACH_BOOKS_QUERY = """
+UNWIND $isbns AS isbn
+MATCH (b:Book {isbn: isbn})
+DETACH DELETE b
+"""
+
+# Zapytania trybu równoległego - węzły-huby powstają w fazie pierwszej,
+# w fazie drugiej relacje tylko dopasowują istniejące węzły
+HUB_NODE_QUERIES = {
+    "Author": "UNWIND $names AS name MERGE (:Author {name: name})",
+    "Publisher": "UNWIND $names AS name MERGE (:Publisher {name: name})",
+    "Language": "UNWIND $names AS name MERGE (:Language {name: name})",
+    "Genre": "UNWIND $names AS name MERGE (:Genre {name: name})"
+}
+
+PARALLEL_RELATIONSHIP_QUERIES = {
+    "WRITTEN_BY": """
+    UNWIND $rows AS row
+    MATCH (b:Book {isbn: row.isbn})
+    MATCH (a:Author {name: row.name})
+    MERGE (b)-[:WRITTEN_BY]->(a)
+    """,
+    "PUBLISHED_BY": """
+    UNWIND $rows AS row
+    MATCH (b:Book {isbn: row.isbn})
+    MATCH (p:Publisher {name: row.name})
+    MERGE (b)-[:PUBLISHED_BY]->(p)
+    """,
+    "WRITTEN_IN": """
+    UNWIND $rows AS row
+    MATCH (b:Book {isbn: row.isbn})
+    MATCH (l:Language {name: row.name})
+    MERGE (b)-[:WRITTEN_IN]->(l)
+    """,
+    "BELONGS_TO": """
+    UNWIND $rows AS row
+    MATCH (b:Book {isbn: row.isbn})
+    MATCH (g:Genre {name: row.name})
+    MERGE (b)-[:BELONGS_TO]->(g)
+    """
+}
+
+CONSTRAINT_QUERIES = [
+    "CREATE CONSTRAINT IF NOT EXISTS FOR (b:Book) REQUIRE b.isbn IS UNIQUE",
+    "CREATE CONSTRAINT IF NOT EXISTS FOR (a:Author) REQUIRE a.name IS UNIQUE",
+    "CREATE CONSTRAINT IF NOT EXISTS FOR (p:Publisher) REQUIRE p.name IS UNIQUE",
+    "CREATE CONSTRAINT IF NOT EXISTS FOR (l:Language) REQUIRE l.name IS UNIQUE",
+    "CREATE CONSTRAINT IF NOT EXISTS FOR (g:Genre) REQUIRE g.name IS UNIQUE"
+]
+
+CLEAR_DATABASE_QUERY = "MATCH (n) DETACH DELETE n"
+
+# Zapytania czyszczenia bazy paczkami - najpierw relacje, potem węzły, żeby usunięcie huba (np. języka
+# z milionami relacji) nie trafiało do jednej transakcji. CALL { } IN TRANSACTIONS (Neo4j 4.4+, jak
+# CREATE CONSTRAINT IF NOT EXISTS) przechodzi po grafie raz i zatwierdza co $batch_size wierszy, zamiast
+# w każdej paczce skanować od początku miejsca po już usuniętych elementach
+COUNT_RELATIONSHIPS_QUERY = "MATCH ()-[r]->() RETURN count(r)"
+COUNT_NODES_QUERY = "MATCH (n) RETURN count(n)"
+DELETE_RELATIONSHIPS_QUERY = "MATCH ()-[r]->() CALL { WITH r DELETE r } IN TRANSACTIONS OF $batch_size ROWS"
+DELETE_NODES_QUERY = "MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF $batch_size ROWS"
+CLEAR_BATCH_SIZE = 10000
+
+# Baza domowa użytkownika - ta, do której trafiają sesje bez podanej nazwy bazy
+HOME_DATABASE_QUERY = "SHOW HOME DATABASE YIELD name"
+
+# Kolumny katalogu potrzebne do importu (bez liczby ocen Amazon)
+IMPORT_COLUMNS = [column for column in BOOK_COLUMNS if column != "rating_amazon_count"]
+
+BOOK_FIELDS = ("isbn", "title", "num_pages", "year", "rating_goodreads", "rating_amazon", "rating_google")
+
+
+def _bucket(key, buckets):
+    return zlib.crc32(key.encode('utf-8')) % buckets
+
+
+def _run(runner, query, **params):
+    # Pojedyncze zapytanie (sesja lub transakcja) z pomiarem czasu odpowiedzi serwera
+    with metrics.latency("neo4j_query", stage="cypher"):
+        return runner.run(query, **params)
+
+
+def _commit(tx):
+    with metrics.latency("neo4j_commit", stage="commit"):
+        tx.commit()
 
 
 class Neo4jBooksImporter:
-    def __init__(self, uri, username, password):
-        self.driver = GraphDatabase.driver(uri, auth=(username, password))
+    def __init__(self, uri, username, password, max_retries=5, retry_backoff=0.2, driver=None):
+        # driver - zamiennik sterownika Neo4j, np. InMemoryGraph().driver() z memory_graph.py do pracy bez serwera
+        self.driver = driver or GraphDatabase.driver(uri, auth=(username, password))
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
 
     def close(self):
         self.driver.close()
 
-    def clear_database(self, delete_constraints=True):
-        with self.driver.session() as session:
-            session.run("MATCH (n) DETACH DELETE n")
+    def clear_database(self, delete_constraints=True, batch_size=None, recreate=False, database=None):
+        # recreate=True - usunięcie i utworzenie bazy od nowa (wymaga wersji Enterprise), w razie błędu czyszczenie paczkami;
+        # batch_size - usuwanie paczkami w osobnych transakcjach, zużycie pamięci serwera nie zależy od rozmiaru grafu;
+        # database - domyślnie baza domowa użytkownika, tak jak przy imporcie
+        if recreate and self._recreate_database(database):
+            if not delete_constraints:
+                with self.driver.session(database=database) as session:
+                    self._create_constraints(session)
+            return
+        if recreate:
+            batch_size = batch_size or CLEAR_BATCH_SIZE
+
+        with self.driver.session(database=database) as session:
+            if batch_size:
+                self._delete_in_batches(session, COUNT_RELATIONSHIPS_QUERY, DELETE_RELATIONSHIPS_QUERY, "relacji",
+                                        batch_size, database)
+                self._delete_in_batches(session, COUNT_NODES_QUERY, DELETE_NODES_QUERY, "węzłów", batch_size, database)
+            else:
+                session.run(CLEAR_DATABASE_QUERY)
             print("Wszystkie węzły i relacje zostały usunięte.")
 
             if delete_constraints:
@@ -26,37 +201,81 @@ class Neo4jBooksImporter:
 
                 print("Wszystkie ograniczenia zostały usunięte.")
 
-    def import_books(self, csv_file):
+    def _recreate_database(self, database):
         try:
-            df = pd.read_csv(csv_file, encoding='utf-8')
-            print(f"Wczytano plik CSV: {csv_file}")
-            print(f"Liczba wierszy: {len(df)}")
-            print(f"Kolumny: {', '.join(df.columns)}")
-
-            required_columns = ['isbn', 'title']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                raise ValueError(f"Brakujące wymagane kolumny w pliku CSV: {', '.join(missing_columns)}")
+            with self.driver.session(database="system") as session:
+                # Bez nazwy odtwarzana jest baza domowa, a nie zawsze "neo4j" - inaczej przy innej bazie domowej
+                # wyczyszczona zostałaby baza, do której import nie trafia
+                database = database or session.run(HOME_DATABASE_QUERY).single()["name"]
+                session.run(f"CREATE OR REPLACE DATABASE `{database}` WAIT").consume()
+        except Exception as e:
+            print(f"Nie udało się utworzyć bazy {database or 'domowej'} od nowa, usuwanie paczkami: {e}")
+            return False
+        print(f"Baza {database} została utworzona od nowa.")
+        return True
+
+    def _delete_in_batches(self, session, count_query, delete_query, label, batch_size, database=None):
+        total = session.run(count_query).single()[0]
+        started = time.perf_counter()
+        # Zapytanie nie zwraca nic do końca usuwania, a każda paczka jest od razu zatwierdzana - postęp
+        # odczytuje osobny wątek z liczby pozostałych elementów (licznik w bazie, bez skanowania grafu)
+        done = threading.Event()
+        watcher = threading.Thread(target=self._watch_deletion, args=(done, count_query, total, label, database),
+                                   daemon=True)
+        watcher.start()
+        try:
+            # IN TRANSACTIONS wymaga transakcji auto-commit (session.run); serwer zatwierdza każdą paczkę osobno
+            _run(session, delete_query, batch_size=batch_size).consume()
+        finally:
+            done.set()
+            watcher.join()
+        deleted = total - session.run(count_query).single()[0]
+        elapsed = time.perf_counter() - started
+        print(f"Usunięto {deleted}/{total} {label} ({deleted / elapsed if elapsed else 0:.0f}/s)")
+        return deleted
+
+    def _watch_deletion(self, done, count_query, total, label, database):
+        with self.driver.session(database=database) as session:
+            while not done.wait(metrics.progress_interval):
+                try:
+                    remaining = session.run(count_query).single()[0]
+                except Exception:
+                    return
+                metrics.progress(total - remaining, total, label=f"usunięte {label}", force=True)
+
+    def _read_books(self, csv_file):
+        # ISBN jako tekst, żeby zachować zera z przodu i stałą postać klucza między plikami.
+        # Z plików kolumnowych (.parquet/.arrow) wczytywane są tylko kolumny używane przy imporcie
+        columns = IMPORT_COLUMNS if is_columnar(csv_file) else None
+        with metrics.stage("read"):
+            df = read_books(csv_file, columns=columns, encoding='utf-8')
+        metrics.count("rows_read", len(df))
+        print(f"Wczytano plik: {csv_file}")
+        print(f"Liczba wierszy: {len(df)}")
+        print(f"Kolumny: {', '.join(df.columns)}")
+
+        required_columns = ['isbn', 'title']
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        if missing_columns:
+            raise ValueError(f"Brakujące wymagane kolumny w pliku CSV: {', '.join(missing_columns)}")
+        return df
+
+    def import_books(self, csv_file, batch_size=None, workers=None):
+        try:
+            df = self._read_books(csv_file)
 
             with self.driver.session() as session:
                 self._create_constraints(session)
 
-                imported_count = 0
-                error_count = 0
-                for _, row in df.iterrows():
-                    try:
-                        self._process_book(session, row)
-                        imported_count += 1
-                    except Exception as e:
-                        error_count += 1
-                        print(f"Błąd podczas przetwarzania książki: {e}")
-
-                        try:
-                            isbn = row.get('isbn', 'Nieznany')
-                            print(f"Problematyczny ISBN: {isbn}")
-                        except:
-                            pass
+                if workers:
+                    imported_count, error_count = self._import_parallel(session, df, workers, batch_size or 1000)
+                elif batch_size:
+                    imported_count, error_count = self._import_batched(session, df, batch_size)
+                else:
+                    imported_count, error_count = self._import_rows(session, normalize_frame(df))
 
+            metrics.count("books_imported", imported_count)
+            metrics.count("errors", error_count)
             print(f"Zaimportowano {imported_count} książek do Neo4j")
             if error_count > 0:
                 print(f"Wystąpiło {error_count} błędów podczas importu")
@@ -65,171 +284,294 @@ class Neo4jBooksImporter:
             print(f"Błąd podczas importu książek: {e}")
             raise
 
-    def _create_constraints(self, session):
-        constraints = [
-            "CREATE CONSTRAINT IF NOT EXISTS FOR (b:Book) REQUIRE b.isbn IS UNIQUE",
-            "CREATE CONSTRAINT IF NOT EXISTS FOR (a:Author) REQUIRE a.name IS UNIQUE",
-            "CREATE CONSTRAINT IF NOT EXISTS FOR (p:Publisher) REQUIRE p.name IS UNIQUE",
-            "CREATE CONSTRAINT IF NOT EXISTS FOR (l:Language) REQUIRE l.name IS UNIQUE",
-            "CREATE CONSTRAINT IF NOT EXISTS FOR (g:Genre) REQUIRE g.name IS UNIQUE"
-        ]
-
-        for constraint in constraints:
-            try:
-                session.run(constraint)
-            except Exception as e:
-                print(f"Problem przy tworzeniu ograniczenia: {e}")
-
-    def _process_book(self, session, row):
+    def import_books_incremental(self, csv_file, state_file, batch_size=1000, detach_removed=False):
+        store = ImportStateStore(state_file)
         try:
-            isbn = str(row['isbn']).strip()
-            if pd.isna(isbn) or isbn == '' or isbn == 'nan':
-                isbn = f"unknown_{hash(str(row))}"
-                print(f"Ostrzeżenie: Znaleziono książkę bez ISBN. Wygenerowano ID: {isbn}")
+            df = self._read_books(csv_file)
+
+            # Przy powtórzonym ISBN wygrywa ostatni wiersz, tak jak przy kolejnych SET
+            books = {book["isbn"]: book for book in normalize_frame(df)}
+            error_count = 0
+
+            stored_hashes = store.load_hashes()
+            hashes = {isbn: book_hash(book) for isbn, book in books.items()}
+            new_isbns = [isbn for isbn in books if isbn not in stored_hashes]
+            changed_isbns = [isbn for isbn in books if isbn in stored_hashes and stored_hashes[isbn] != hashes[isbn]]
+            removed_isbns = [isbn for isbn in stored_hashes if isbn not in books]
+            pending = new_isbns + changed_isbns
+
+            checkpoint = store.last_checkpoint(csv_file)
+            if checkpoint:
+                print(f"Wznawianie przerwanego importu (ostatnio zapisana paczka {checkpoint[0]}/{checkpoint[1]})")
+            print(f"Nowe: {len(new_isbns)}, zmienione: {len(changed_isbns)}, "
+                  f"bez zmian: {len(books) - len(pending)}, usunięte: {len(removed_isbns)}")
+
+            imported_count = 0
+            changed = set(changed_isbns)
+            total_batches = (len(pending) + batch_size - 1) // batch_size
+            with self.driver.session() as session:
+                self._create_constraints(session)
 
-            title = str(row['title']).strip() if not pd.isna(row['title']) else "Nieznany tytuł"
-        except Exception as e:
-            raise ValueError(f"Błąd podczas przetwarzania podstawowych danych książki: {e}")
+                for batch_number, start in enumerate(range(0, len(pending), batch_size), start=1):
+                    batch_isbns = pending[start:start + batch_size]
+                    started = time.perf_counter()
+                    try:
+                        with session.begin_transaction() as tx:
+                            reset_isbns = [isbn for isbn in batch_isbns if isbn in changed]
+                            if reset_isbns:
+                                _run(tx, RESET_BOOK_QUERY, isbns=reset_isbns)
+                            self._write_batch(tx, [books[isbn] for isbn in batch_isbns])
+                            _commit(tx)
+                    except Exception as e:
+                        # Paczka bez punktu kontrolnego zostanie wysłana ponownie przy następnym uruchomieniu
+                        error_count += len(batch_isbns)
+                        print(f"Błąd podczas zapisu paczki {batch_number}/{total_batches}: {e}")
+                        continue
 
-        publisher = row.get('publisher', '')
-        if pd.isna(publisher) or publisher == '':
-            publisher = 'Nieznany'
-        else:
-            publisher = str(publisher).strip()
+                    store.commit_batch(csv_file, {isbn: hashes[isbn] for isbn in batch_isbns},
+                                       batch_number, total_batches)
+                    imported_count += len(batch_isbns)
+                    elapsed = time.perf_counter() - started
+                    metrics.log(f"Paczka {batch_number}/{total_batches}: {len(batch_isbns)} książek w {elapsed:.2f} s")
+                    metrics.progress(imported_count, len(pending), label="zaimportowane książki")
+
+                if detach_removed and removed_isbns:
+                    for start in range(0, len(removed_isbns), batch_size):
+                        chunk = removed_isbns[start:start + batch_size]
+                        self._run_with_retry(session, DETACH_BOOKS_QUERY, isbns=chunk)
+                        store.remove(chunk)
+                    print(f"Usunięto {len(removed_isbns)} książek nieobecnych w pliku")
+
+            if error_count == 0:
+                store.finish(csv_file)
+            metrics.count("books_imported", imported_count)
+            metrics.count("errors", error_count)
+            print(f"Zaimportowano {imported_count} nowych lub zmienionych książek do Neo4j")
+            if error_count > 0:
+                print(f"Wystąpiło {error_count} błędów podczas importu")
 
-        pub_date = row.get('publication_date', '')
-        year = None
-        if not pd.isna(pub_date) and pub_date != '':
+        except Exception as e:
+            print(f"Błąd podczas importu książek: {e}")
+            raise
+        finally:
+            store.close()
+
+    def _import_rows(self, session, books):
+        # books - słowniki z normalize_frame, znormalizowane raz dla całego pliku
+        imported_count = 0
+        error_count = 0
+        for book in books:
             try:
-                year = int(float(pub_date))
-            except (ValueError, TypeError):
-                print(
-                    f"Ostrzeżenie: Nie można przekonwertować roku '{pub_date}' na liczbę dla ISBN {isbn}. Rok nie zostanie dodany.")
-                year = None
-
-        language = row.get('language', '')
-        if pd.isna(language) or language == '':
-            language = 'Nieznany'
-        else:
-            language = str(language).strip()
+                self._process_book(session, book)
+                imported_count += 1
+            except Exception as e:
+                error_count += 1
+                metrics.log(f"Błąd podczas przetwarzania książki: {e}")
+                metrics.log(f"Problematyczny ISBN: {book['isbn']}")
+            metrics.progress(imported_count + error_count, len(books), label="przetworzone książki")
 
-        try:
-            num_pages = int(row.get('num_pages', 0)) if not pd.isna(row.get('num_pages', 0)) else 0
-        except:
-            num_pages = 0
+        return imported_count, error_count
 
-        try:
-            rating_goodreads = float(row.get('rating_goodreads', 0)) if not pd.isna(
-                row.get('rating_goodreads', 0)) else None
-            rating_amazon = float(row.get('rating_amazon', 0)) if not pd.isna(row.get('rating_amazon', 0)) else None
-            rating_google = float(row.get('rating_google', 0)) if not pd.isna(row.get('rating_google', 0)) else None
-        except Exception as e:
-            print(f"Ostrzeżenie: Problem z konwersją ocen dla ISBN {isbn}: {e}")
-            rating_goodreads = None
-            rating_amazon = None
-            rating_google = None
-
-        book_query = """
-        MERGE (b:Book {isbn: $isbn})
-        SET b.title = $title,
-            b.num_pages = $num_pages
-        """
-
-        params = {
-            "isbn": isbn,
-            "title": title,
-            "num_pages": num_pages
-        }
+    def _import_batched(self, session, df, batch_size):
+        imported_count = 0
+        error_count = 0
+        total_batches = (len(df) + batch_size - 1) // batch_size
+        records = normalize_frame(df)
 
-        if year is not None:
-            book_query += ", b.publication_year = $year"
-            params["year"] = year
+        for batch_number, start in enumerate(range(0, len(df), batch_size), start=1):
+            books = records[start:start + batch_size]
+            started = time.perf_counter()
 
-        if rating_goodreads is not None:
-            book_query += ", b.rating_goodreads = $rating_goodreads"
-            params["rating_goodreads"] = rating_goodreads
+            try:
+                with session.begin_transaction() as tx:
+                    self._write_batch(tx, books)
+                    _commit(tx)
+                imported_count += len(books)
+            except Exception as e:
+                print(f"Błąd podczas zapisu paczki {batch_number}/{total_batches}: {e}")
+                print("Ponawianie paczki wiersz po wierszu...")
+                rows_imported, rows_failed = self._import_rows(session, books)
+                imported_count += rows_imported
+                error_count += rows_failed
+                continue
+
+            elapsed = time.perf_counter() - started
+            rate = len(books) / elapsed if elapsed > 0 else float('inf')
+            metrics.log(f"Paczka {batch_number}/{total_batches}: {len(books)} książek w {elapsed:.2f} s "
+                        f"({rate:.0f} książek/s)")
+            metrics.progress(imported_count, len(df), label="zaimportowane książki")
+
+        return imported_count, error_count
+
+    def _write_batch(self, tx, books):
+        if not books:
+            return
+
+        _run(tx, BATCH_BOOK_QUERY, rows=books)
+
+        publishers = [{"isbn": b["isbn"], "name": b["publisher"]} for b in books if b["publisher"]]
+        languages = [{"isbn": b["isbn"], "name": b["language"]} for b in books if b["language"]]
+        authors = [{"isbn": b["isbn"], "name": a} for b in books for a in b["authors"]]
+        genres = [{"isbn": b["isbn"], "name": g} for b in books for g in b["genres"]]
+
+        if publishers:
+            _run(tx, BATCH_PUBLISHER_QUERY, rows=publishers)
+        if languages:
+            _run(tx, BATCH_LANGUAGE_QUERY, rows=languages)
+        if authors:
+            _run(tx, BATCH_AUTHOR_QUERY, rows=authors)
+        if genres:
+            _run(tx, BATCH_GENRE_QUERY, rows=genres)
+
+    def _import_parallel(self, session, df, workers, batch_size):
+        books = normalize_frame(df)
+        error_count = 0
+
+        # Faza 1: wszystkie węzły-huby tworzone jednorazowo, bez duplikatów
+        started = time.perf_counter()
+        hubs = {
+            "Author": {a for b in books for a in b["authors"]},
+            "Publisher": {b["publisher"] for b in books if b["publisher"]},
+            "Language": {b["language"] for b in books if b["language"]},
+            "Genre": {g for b in books for g in b["genres"]}
+        }
+        for label, names in hubs.items():
+            names = sorted(names)
+            for start in range(0, len(names), batch_size):
+                self._run_with_retry(session, HUB_NODE_QUERIES[label], names=names[start:start + batch_size])
+            print(f"Utworzono {len(names)} węzłów {label}")
+        print(f"Faza 1 zakończona w {time.perf_counter() - started:.2f} s")
+
+        # Faza 2a: węzły Book podzielone według ISBN - partycje są rozłączne
+        started = time.perf_counter()
+        partitions = [[] for _ in range(workers)]
+        for book in books:
+            partitions[_bucket(book["isbn"], workers)].append({field: book[field] for field in BOOK_FIELDS})
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda rows: self._write_partition(BATCH_BOOK_QUERY, rows, batch_size),
+                                    partitions))
+
+        imported_count = sum(written for written, _ in results)
+        for _, failed in results:
+            for book in failed:
+                error_count += 1
+                metrics.log(f"Problematyczny ISBN: {book['isbn']}")
+        elapsed = time.perf_counter() - started
+        rate = imported_count / elapsed if elapsed > 0 else float('inf')
+        print(f"Faza 2: zapisano {imported_count} węzłów Book w {elapsed:.2f} s ({rate:.0f} książek/s)")
+
+        # Faza 2b: relacje w siatce (kubełek huba, kubełek książki). W każdej rundzie
+        # worker i dostaje komórkę (i, i + runda), więc równoległe transakcje nigdy
+        # nie blokują tego samego huba ani tej samej książki
+        relationships = {
+            "WRITTEN_BY": [{"isbn": b["isbn"], "name": a} for b in books for a in b["authors"]],
+            "PUBLISHED_BY": [{"isbn": b["isbn"], "name": b["publisher"]} for b in books if b["publisher"]],
+            "WRITTEN_IN": [{"isbn": b["isbn"], "name": b["language"]} for b in books if b["language"]],
+            "BELONGS_TO": [{"isbn": b["isbn"], "name": g} for b in books for g in b["genres"]]
+        }
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for rel_type, rows in relationships.items():
+                started = time.perf_counter()
+                grid = {}
+                for rel in rows:
+                    cell = (_bucket(rel["name"], workers), _bucket(rel["isbn"], workers))
+                    grid.setdefault(cell, []).append(rel)
+
+                written = 0
+                failed = 0
+                query = PARALLEL_RELATIONSHIP_QUERIES[rel_type]
+                for round_number in range(workers):
+                    cells = [grid.get((i, (i + round_number) % workers), []) for i in range(workers)]
+                    for cell_written, cell_failed in pool.map(
+                            lambda cell_rows: self._write_partition(query, cell_rows, batch_size), cells):
+                        written += cell_written
+                        failed += len(cell_failed)
+
+                print(f"Relacje {rel_type}: {written} w {time.perf_counter() - started:.2f} s")
+                if failed:
+                    metrics.count("relationship_errors", failed)
+                    print(f"Ostrzeżenie: Nie udało się zapisać {failed} relacji {rel_type}")
+
+        return imported_count, error_count
+
+    def _write_partition(self, query, rows, batch_size):
+        written = 0
+        failed = []
+        if not rows:
+            return written, failed
 
-        if rating_amazon is not None:
-            book_query += ", b.rating_amazon = $rating_amazon"
-            params["rating_amazon"] = rating_amazon
+        with self.driver.session() as session:
+            for start in range(0, len(rows), batch_size):
+                chunk = rows[start:start + batch_size]
+                try:
+                    self._run_with_retry(session, query, rows=chunk)
+                    written += len(chunk)
+                except Exception as e:
+                    metrics.log(f"Błąd podczas zapisu paczki: {e}")
+                    failed.extend(chunk)
+
+        return written, failed
+
+    def _run_with_retry(self, session, query, **params):
+        for attempt in range(self.max_retries + 1):
+            try:
+                with session.begin_transaction() as tx:
+                    _run(tx, query, **params)
+                    _commit(tx)
+                return
+            except TransientError as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_backoff * (2 ** attempt) * (1 + random.random())
+                metrics.count("lock_retries")
+                metrics.log(f"Ostrzeżenie: Konflikt blokad ({e.code}), ponowienie za {delay:.2f} s")
+                time.sleep(delay)
 
-        if rating_google is not None:
-            book_query += ", b.rating_google = $rating_google"
-            params["rating_google"] = rating_google
+    def _create_constraints(self, session):
+        for constraint in CONSTRAINT_QUERIES:
+            try:
+                session.run(constraint)
+            except Exception as e:
+                print(f"Problem przy tworzeniu ograniczenia: {e}")
 
-        book_query += " RETURN b"
+    def _process_book(self, session, book):
+        # Te same zapytania co w trybie wsadowym, z paczką jednego wiersza - coalesce zachowuje
+        # dotychczasowy rok i oceny, gdy w wierszu ich brakuje
+        isbn = book["isbn"]
 
         try:
-            session.run(book_query, **params)
+            _run(session, BATCH_BOOK_QUERY, rows=[{field: book[field] for field in BOOK_FIELDS}])
         except Exception as e:
             raise ValueError(f"Błąd podczas tworzenia węzła Book: {e}")
 
-        if publisher and publisher != 'Nieznany':
+        if book["publisher"]:
             try:
-                publisher_query = """
-                MERGE (p:Publisher {name: $publisher})
-                WITH p
-                MATCH (b:Book {isbn: $isbn})
-                MERGE (b)-[:PUBLISHED_BY]->(p)
-                """
-                session.run(publisher_query, publisher=publisher, isbn=isbn)
+                _run(session, BATCH_PUBLISHER_QUERY, rows=[{"isbn": isbn, "name": book["publisher"]}])
             except Exception as e:
-                print(f"Ostrzeżenie: Problem z przetwarzaniem wydawcy dla ISBN {isbn}: {e}")
+                metrics.count("relationship_warnings")
+                metrics.log(f"Ostrzeżenie: Problem z przetwarzaniem wydawcy dla ISBN {isbn}: {e}")
 
-        if language and language != 'Nieznany':
+        if book["language"]:
             try:
-                language_query = """
-                MERGE (l:Language {name: $language})
-                WITH l
-                MATCH (b:Book {isbn: $isbn})
-                MERGE (b)-[:WRITTEN_IN]->(l)
-                """
-                session.run(language_query, language=language, isbn=isbn)
+                _run(session, BATCH_LANGUAGE_QUERY, rows=[{"isbn": isbn, "name": book["language"]}])
             except Exception as e:
-                print(f"Ostrzeżenie: Problem z przetwarzaniem języka dla ISBN {isbn}: {e}")
+                metrics.count("relationship_warnings")
+                metrics.log(f"Ostrzeżenie: Problem z przetwarzaniem języka dla ISBN {isbn}: {e}")
 
-        authors_raw = row.get('authors', '')
-        if not pd.isna(authors_raw) and authors_raw != '':
+        if book["authors"]:
             try:
-                if isinstance(authors_raw, str) and authors_raw.startswith('"') and authors_raw.endswith('"'):
-                    authors_content = authors_raw[1:-1]
-                else:
-                    authors_content = str(authors_raw)
-
-                author_list = [a.strip() for a in authors_content.split(',')]
-
-                for author in author_list:
-                    if not author or author == 'nan':
-                        continue
-
-                    author_query = """
-                    MERGE (a:Author {name: $author})
-                    WITH a
-                    MATCH (b:Book {isbn: $isbn})
-                    MERGE (b)-[:WRITTEN_BY]->(a)
-                    """
-                    session.run(author_query, author=author, isbn=isbn)
+                _run(session, BATCH_AUTHOR_QUERY, rows=[{"isbn": isbn, "name": author} for author in book["authors"]])
             except Exception as e:
-                print(f"Ostrzeżenie: Problem z przetwarzaniem autorów dla ISBN {isbn}: {e}")
+                metrics.count("relationship_warnings")
+                metrics.log(f"Ostrzeżenie: Problem z przetwarzaniem autorów dla ISBN {isbn}: {e}")
 
-        categories = row.get('category', '')
-        if not pd.isna(categories) and categories != '':
+        if book["genres"]:
             try:
-                genre_list = [g.strip() for g in str(categories).split(',')]
-
-                for genre in genre_list:
-                    if not genre or genre == 'nan':
-                        continue
-
-                    genre_query = """
-                    MERGE (g:Genre {name: $genre})
-                    WITH g
-                    MATCH (b:Book {isbn: $isbn})
-                    MERGE (b)-[:BELONGS_TO]->(g)
-                    """
-                    session.run(genre_query, genre=genre, isbn=isbn)
+                _run(session, BATCH_GENRE_QUERY, rows=[{"isbn": isbn, "name": genre} for genre in book["genres"]])
             except Exception as e:
-                print(f"Ostrzeżenie: Problem z przetwarzaniem kategorii dla ISBN {isbn}: {e}")
+                metrics.count("relationship_warnings")
+                metrics.log(f"Ostrzeżenie: Problem z przetwarzaniem kategorii dla ISBN {isbn}: {e}")
 
 
 # Usage example
@@ -238,9 +580,11 @@ if __name__ == "__main__":
     username = "neo4j"
     password = "password"
 
+    metrics.configure(tool="DBCreator")
     importer = Neo4jBooksImporter(uri, username, password)
 
     try:
-        importer.import_books("../databases/Books1KPlus.csv")
+        importer.import_books("../databases/Books1KPlus.csv", batch_size=1000, workers=4)
     finally:
-        importer.close()
\ No newline at end of file
+        importer.close()
+        metrics.write_report("../databases/import_report.json")
\ No newline at end of file
@@ -0,0 +1,378 @@
+import math
+import threading
+from array import array
+
+from neo4j import Record
+
+from main import (BATCH_AUTHOR_QUERY, BATCH_BOOK_QUERY, BATCH_GENRE_QUERY, BATCH_LANGUAGE_QUERY,
+                  BATCH_PUBLISHER_QUERY, CLEAR_DATABASE_QUERY, CONSTRAINT_QUERIES, COUNT_NODES_QUERY,
+                  COUNT_RELATIONSHIPS_QUERY, DELETE_NODES_QUERY, DELETE_RELATIONSHIPS_QUERY, DETACH_BOOKS_QUERY,
+                  HOME_DATABASE_QUERY, HUB_NODE_QUERIES, PARALLEL_RELATIONSHIP_QUERIES, RESET_BOOK_QUERY)
+
+# Typ relacji -> etykieta węzła-huba, do którego prowadzi
+RELATIONSHIP_TARGETS = {
+    "WRITTEN_BY": "Author",
+    "PUBLISHED_BY": "Publisher",
+    "WRITTEN_IN": "Language",
+    "BELONGS_TO": "Genre"
+}
+
+# Właściwości liczbowe książki trzymane w tablicach float64 (NaN = brak właściwości)
+NUMBER_FIELDS = {"num_pages": "num_pages", "publication_year": "year", "rating_goodreads": "rating_goodreads",
+                 "rating_amazon": "rating_amazon", "rating_google": "rating_google"}
+INT_FIELDS = ("num_pages", "publication_year")
+# Właściwości usuwane przez RESET_BOOK_QUERY
+OPTIONAL_FIELDS = ("publication_year", "rating_goodreads", "rating_amazon", "rating_google")
+
+BATCH_RELATIONSHIP_QUERIES = {
+    BATCH_PUBLISHER_QUERY: "PUBLISHED_BY",
+    BATCH_LANGUAGE_QUERY: "WRITTEN_IN",
+    BATCH_AUTHOR_QUERY: "WRITTEN_BY",
+    BATCH_GENRE_QUERY: "BELONGS_TO"
+}
+
+
+class _NameIndex:
+    # Nazwy węzłów jednej etykiety zapisane raz; relacje przechowują tylko numery węzłów
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+
+    def merge(self, name):
+        node = self.ids.get(name)
+        if node is None:
+            node = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return node
+
+    def remove(self, node):
+        del self.ids[self.names[node]]
+        self.names[node] = None
+
+    def clear(self):
+        self.names = []
+        self.ids = {}
+
+
+class _Adjacency:
+    # Listy sąsiedztwa jednego typu relacji w tablicach int32: książka -> huby i hub -> książki.
+    # Usunięte relacje znikają od razu z listy książki, a z listy huba przy najbliższym odczycie
+    def __init__(self):
+        self.outgoing = []
+        self.incoming = []
+        self.stale = set()
+        self.count = 0
+        # Książki o numerach mniejszych niż cleared nie mają relacji - usuwanie paczkami zaczyna od tego miejsca
+        self.cleared = 0
+
+    def _grow(self, lists, node):
+        while len(lists) <= node:
+            lists.append(array('i'))
+
+    def merge(self, book, hub):
+        self._grow(self.outgoing, book)
+        self._grow(self.incoming, hub)
+        if hub in self.outgoing[book]:
+            return
+        self.outgoing[book].append(hub)
+        self.incoming[hub].append(book)
+        self.count += 1
+        self.cleared = min(self.cleared, book)
+
+    def hubs(self, book):
+        return self.outgoing[book] if book < len(self.outgoing) else array('i')
+
+    def books(self, hub):
+        if hub >= len(self.incoming):
+            return array('i')
+        if hub in self.stale:
+            linked = (book for book in dict.fromkeys(self.incoming[hub]) if hub in self.hubs(book))
+            self.incoming[hub] = array('i', linked)
+            self.stale.discard(hub)
+        return self.incoming[hub]
+
+    def remove_book(self, book, limit=None):
+        hubs = self.hubs(book)
+        removed = len(hubs) if limit is None else min(limit, len(hubs))
+        if not removed:
+            return 0
+        self.stale.update(hubs[:removed])
+        self.outgoing[book] = hubs[removed:]
+        self.count -= removed
+        return removed
+
+    def has_hub(self, hub):
+        return len(self.books(hub)) > 0
+
+    def clear(self):
+        self.__init__()
+
+
+class _Result:
+    def __init__(self, records=()):
+        self.records = list(records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def single(self):
+        return self.records[0] if self.records else None
+
+    def data(self):
+        return [dict(record) for record in self.records]
+
+    def consume(self):
+        self.records = []
+
+
+class InMemoryGraph:
+    # Graf książek w pamięci procesu z tym samym modelem co baza Neo4j: węzły Book (unikalny ISBN),
+    # Author/Publisher/Language/Genre (unikalna nazwa) i cztery typy relacji. Importer korzysta z niego
+    # przez driver(), który wykonuje zapytania Neo4jBooksImporter zamiast wysyłać je do serwera
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.books = _NameIndex()
+        self.titles = []
+        self.numbers = {field: array('d') for field in NUMBER_FIELDS}
+        self.hubs = {label: _NameIndex() for label in RELATIONSHIP_TARGETS.values()}
+        self.relationships = {rel_type: _Adjacency() for rel_type in RELATIONSHIP_TARGETS}
+        self.constraints = {}
+        self._handlers = {
+            BATCH_BOOK_QUERY: lambda params: self._merge_books(params["rows"]),
+            RESET_BOOK_QUERY: lambda params: self._reset_books(params["isbns"]),
+            DETACH_BOOKS_QUERY: lambda params: self._detach_books(params["isbns"]),
+            CLEAR_DATABASE_QUERY: lambda params: self.clear(),
+            COUNT_RELATIONSHIPS_QUERY: lambda params: _Result([Record({"count(r)": self.relationship_count()})]),
+            COUNT_NODES_QUERY: lambda params: _Result([Record({"count(n)": self.node_count()})]),
+            DELETE_RELATIONSHIPS_QUERY: lambda params: self._delete_in_transactions(params["batch_size"]),
+            DELETE_NODES_QUERY: lambda params: self._detach_delete_nodes(params["batch_size"]),
+            HOME_DATABASE_QUERY: lambda params: _Result([Record({"name": "neo4j"})]),
+            "SHOW CONSTRAINTS": lambda params: _Result(Record({"name": name}) for name in self.constraints)
+        }
+        for position, query in enumerate(CONSTRAINT_QUERIES):
+            self._handlers[query] = lambda params, query=query, position=position: self._create_constraint(query, position)
+        for query, rel_type in BATCH_RELATIONSHIP_QUERIES.items():
+            self._handlers[query] = lambda params, rel_type=rel_type: self._merge_relationships(rel_type, params["rows"], True)
+        for label, query in HUB_NODE_QUERIES.items():
+            self._handlers[query] = lambda params, label=label: self._merge_hubs(label, params["names"])
+        for rel_type, query in PARALLEL_RELATIONSHIP_QUERIES.items():
+            self._handlers[query] = lambda params, rel_type=rel_type: self._merge_relationships(rel_type, params["rows"], False)
+
+    def driver(self):
+        return InMemoryDriver(self)
+
+    # ---------------------
+    # Wykonywanie zapytań importera
+    def handler(self, query):
+        handler = self._handlers.get(query)
+        if handler is None:
+            # Polecenia z nazwą w treści zapytania
+            if query.startswith("DROP CONSTRAINT "):
+                return lambda params: self.constraints.pop(query.split()[2].strip("`"), None)
+            if query.startswith("CREATE OR REPLACE DATABASE "):
+                return lambda params: self.clear(constraints=True)
+            raise ValueError(f"Zapytanie nieobsługiwane przez graf w pamięci: {query.strip()[:80]}")
+        return handler
+
+    def execute(self, query, params):
+        handler = self.handler(query)
+        with self.lock:
+            result = handler(params)
+        return result if isinstance(result, _Result) else _Result()
+
+    def _create_constraint(self, query, position):
+        # Unikalność kluczy wynika z indeksów nazw - ograniczenie jest tylko zapamiętywane dla SHOW/DROP CONSTRAINT
+        name = f"constraint_{position}"
+        self.constraints.setdefault(name, query)
+
+    def _merge_books(self, rows):
+        for row in rows:
+            book = self.books.merge(row["isbn"])
+            if book == len(self.titles):
+                self.titles.append(None)
+                for values in self.numbers.values():
+                    values.append(math.nan)
+            self.titles[book] = row["title"]
+            self._set_number("num_pages", book, row["num_pages"])
+            # coalesce z BATCH_BOOK_QUERY: brak wartości w wierszu nie usuwa zapisanej wcześniej
+            for field, key in NUMBER_FIELDS.items():
+                if field != "num_pages" and row.get(key) is not None:
+                    self._set_number(field, book, row[key])
+
+    def _set_number(self, field, book, value):
+        self.numbers[field][book] = math.nan if value is None else float(value)
+
+    def _merge_hubs(self, label, names):
+        for name in names:
+            self.hubs[label].merge(name)
+
+    def _merge_relationships(self, rel_type, rows, create_hub):
+        # create_hub=True - MERGE węzła huba (tryb wsadowy), False - tylko MATCH istniejącego (tryb równoległy)
+        hubs = self.hubs[RELATIONSHIP_TARGETS[rel_type]]
+        adjacency = self.relationships[rel_type]
+        for row in rows:
+            hub = hubs.merge(row["name"]) if create_hub else hubs.ids.get(row["name"])
+            book = self.books.ids.get(row["isbn"])
+            if hub is not None and book is not None:
+                adjacency.merge(book, hub)
+
+    def _reset_books(self, isbns):
+        for isbn in isbns:
+            book = self.books.ids.get(isbn)
+            if book is None:
+                continue
+            for field in OPTIONAL_FIELDS:
+                self.numbers[field][book] = math.nan
+            for adjacency in self.relationships.values():
+                adjacency.remove_book(book)
+
+    def _detach_books(self, isbns):
+        self._reset_books(isbns)
+        for isbn in isbns:
+            book = self.books.ids.get(isbn)
+            if book is not None:
+                self.books.remove(book)
+                self.titles[book] = None
+
+    def _delete_relationships(self, limit):
+        deleted = 0
+        for adjacency in self.relationships.values():
+            for book in range(adjacency.cleared, len(adjacency.outgoing)):
+                if deleted == limit:
+                    break
+                deleted += adjacency.remove_book(book, limit - deleted)
+                if not len(adjacency.outgoing[book]):
+                    adjacency.cleared = book + 1
+        return _Result([Record({"count(r)": deleted})])
+
+    def _delete_in_transactions(self, batch_size):
+        # Jak CALL { } IN TRANSACTIONS - paczki po batch_size relacji aż do usunięcia wszystkich
+        while self._delete_relationships(batch_size).single()[0]:
+            pass
+
+    def _detach_delete_nodes(self, batch_size):
+        # DETACH DELETE - najpierw relacje, potem wszystkie węzły
+        self._delete_in_transactions(batch_size)
+        for index in [self.books] + list(self.hubs.values()):
+            for node, name in enumerate(index.names):
+                if name is not None:
+                    index.remove(node)
+        self.titles = [None] * len(self.titles)
+
+    def clear(self, constraints=False):
+        self.books.clear()
+        self.titles = []
+        self.numbers = {field: array('d') for field in NUMBER_FIELDS}
+        for index in self.hubs.values():
+            index.clear()
+        for adjacency in self.relationships.values():
+            adjacency.clear()
+        if constraints:
+            self.constraints = {}
+
+    # ---------------------
+    # Odczyt
+    def node_count(self, label=None):
+        with self.lock:
+            counts = {"Book": len(self.books.ids)}
+            counts.update((name, len(index.ids)) for name, index in self.hubs.items())
+        return counts[label] if label else sum(counts.values())
+
+    def relationship_count(self, rel_type=None):
+        with self.lock:
+            if rel_type:
+                return self.relationships[rel_type].count
+            return sum(adjacency.count for adjacency in self.relationships.values())
+
+    def _book(self, book):
+        result = {"isbn": self.books.names[book], "title": self.titles[book]}
+        for field, values in self.numbers.items():
+            if not math.isnan(values[book]):
+                result[field] = int(values[book]) if field in INT_FIELDS else values[book]
+        for rel_type, label in RELATIONSHIP_TARGETS.items():
+            names = self.hubs[label].names
+            result[rel_type] = [names[hub] for hub in self.relationships[rel_type].hubs(book)]
+        return result
+
+    def book(self, isbn):
+        with self.lock:
+            book = self.books.ids.get(isbn)
+            return None if book is None else self._book(book)
+
+    def _books_by(self, rel_type, name):
+        with self.lock:
+            hub = self.hubs[RELATIONSHIP_TARGETS[rel_type]].ids.get(name)
+            if hub is None:
+                return []
+            return [self._book(book) for book in self.relationships[rel_type].books(hub)]
+
+    def books_by_author(self, name):
+        return self._books_by("WRITTEN_BY", name)
+
+    def books_by_genre(self, name):
+        return self._books_by("BELONGS_TO", name)
+
+    def books_by_publisher(self, name):
+        return self._books_by("PUBLISHED_BY", name)
+
+    def books_by_language(self, name):
+        return self._books_by("WRITTEN_IN", name)
+
+
+class InMemoryTransaction:
+    # Zapytania są sprawdzane od razu, a wykonywane razem przy commit - transakcja bez commit nie zmienia grafu
+    def __init__(self, graph):
+        self.graph = graph
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.pending = []
+
+    def run(self, query, parameters=None, **params):
+        self.graph.handler(query)
+        self.pending.append((query, dict(parameters or {}, **params)))
+        return _Result()
+
+    def commit(self):
+        with self.graph.lock:
+            for query, params in self.pending:
+                self.graph.execute(query, params)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+
+class InMemorySession:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def run(self, query, parameters=None, **params):
+        return self.graph.execute(query, dict(parameters or {}, **params))
+
+    def begin_transaction(self):
+        return InMemoryTransaction(self.graph)
+
+    def close(self):
+        pass
+
+
+class InMemoryDriver:
+    # Zamiennik neo4j.Driver dla Neo4jBooksImporter(driver=...)
+    def __init__(self, graph):
+        self.graph = graph
+
+    def session(self, database=None, **config):
+        return InMemorySession(self.graph)
+
+    def close(self):
+        pass
@@ -0,0 +1,224 @@
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Wspólna instrumentacja (instrumentation.py) leży w katalogu głównym projektu
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from instrumentation import metrics
+
+
+def _warn(message):
+    # Ostrzeżenia dla pojedynczych wierszy są liczone zawsze, a wypisywane tylko przy poziomie VERBOSE
+    metrics.count("normalization_warnings")
+    metrics.log(message)
+
+
+@metrics.stage("normalize")
+def normalize_book(row):
+    try:
+        isbn = str(row['isbn']).strip()
+        if pd.isna(isbn) or isbn == '' or isbn == 'nan':
+            isbn = f"unknown_{hashlib.sha1(str(row).encode('utf-8')).hexdigest()[:16]}"
+            _warn(f"Ostrzeżenie: Znaleziono książkę bez ISBN. Wygenerowano ID: {isbn}")
+
+        title = str(row['title']).strip() if not pd.isna(row['title']) else "Nieznany tytuł"
+    except Exception as e:
+        raise ValueError(f"Błąd podczas przetwarzania podstawowych danych książki: {e}")
+
+    publisher = row.get('publisher', '')
+    if pd.isna(publisher) or publisher == '':
+        publisher = 'Nieznany'
+    else:
+        publisher = str(publisher).strip()
+
+    pub_date = row.get('publication_date', '')
+    year = None
+    if not pd.isna(pub_date) and pub_date != '':
+        try:
+            year = int(float(pub_date))
+        except (ValueError, TypeError):
+            _warn(
+                f"Ostrzeżenie: Nie można przekonwertować roku '{pub_date}' na liczbę dla ISBN {isbn}. Rok nie zostanie dodany.")
+            year = None
+
+    language = row.get('language', '')
+    if pd.isna(language) or language == '':
+        language = 'Nieznany'
+    else:
+        language = str(language).strip()
+
+    try:
+        num_pages = int(row.get('num_pages', 0)) if not pd.isna(row.get('num_pages', 0)) else 0
+    except:
+        num_pages = 0
+
+    try:
+        rating_goodreads = float(row.get('rating_goodreads', 0)) if not pd.isna(
+            row.get('rating_goodreads', 0)) else None
+        rating_amazon = float(row.get('rating_amazon', 0)) if not pd.isna(row.get('rating_amazon', 0)) else None
+        rating_google = float(row.get('rating_google', 0)) if not pd.isna(row.get('rating_google', 0)) else None
+    except Exception as e:
+        _warn(f"Ostrzeżenie: Problem z konwersją ocen dla ISBN {isbn}: {e}")
+        rating_goodreads = None
+        rating_amazon = None
+        rating_google = None
+
+    author_list = []
+    authors_raw = row.get('authors', '')
+    if not pd.isna(authors_raw) and authors_raw != '':
+        try:
+            if isinstance(authors_raw, str) and authors_raw.startswith('"') and authors_raw.endswith('"'):
+                authors_content = authors_raw[1:-1]
+            else:
+                authors_content = str(authors_raw)
+
+            author_list = [a.strip() for a in authors_content.split(',')]
+            author_list = [a for a in author_list if a and a != 'nan']
+        except Exception as e:
+            _warn(f"Ostrzeżenie: Problem z przetwarzaniem autorów dla ISBN {isbn}: {e}")
+
+    genre_list = []
+    categories = row.get('category', '')
+    if not pd.isna(categories) and categories != '':
+        try:
+            genre_list = [g.strip() for g in str(categories).split(',')]
+            genre_list = [g for g in genre_list if g and g != 'nan']
+        except Exception as e:
+            _warn(f"Ostrzeżenie: Problem z przetwarzaniem kategorii dla ISBN {isbn}: {e}")
+
+    return {
+        "isbn": isbn,
+        "title": title,
+        "num_pages": num_pages,
+        "year": year,
+        "rating_goodreads": rating_goodreads,
+        "rating_amazon": rating_amazon,
+        "rating_google": rating_google,
+        "publisher": publisher if publisher and publisher != 'Nieznany' else None,
+        "language": language if language and language != 'Nieznany' else None,
+        "authors": author_list,
+        "genres": genre_list
+    }
+
+
+def _unknown_isbn(row):
+    return f"unknown_{hashlib.sha1(str(row).encode('utf-8')).hexdigest()[:16]}"
+
+
+def _optional_name(df, column):
+    # Odpowiednik reguły 'Nieznany' z normalize_book: brak, '' i 'Nieznany' dają None
+    if column not in df.columns:
+        return pd.Series([None] * len(df), index=df.index, dtype=object)
+    values = df[column]
+    present = values.notna() & (values.astype(str) != '')
+    names = values.astype(str).str.strip()
+    keep = present & (names != '') & (names != 'Nieznany')
+    return names.astype(object).where(keep, None)
+
+
+def _split_names(values, strip_quotes):
+    # Lista "a, b" rozwinięta do długiej tabeli (pozycja wiersza, nazwa)
+    present = values.notna() & (values.astype(str) != '')
+    text = values[present].astype(str)
+    if strip_quotes:
+        quoted = text.str.startswith('"') & text.str.endswith('"') & (text.str.len() >= 2)
+        text = text.where(~quoted, text.str[1:-1])
+        # Pojedynczy znak '"' zaczyna się i kończy cudzysłowem - normalize_book zwraca wtedy ''
+        text = text.where(text != '"', '')
+    names = text.str.split(',').explode().str.strip()
+    return names[names.notna() & (names != '') & (names != 'nan')]
+
+
+def _collect_names(df, names, lists):
+    # Długa tabela z powrotem do list per wiersz - zwykła pętla jest tu dużo szybsza niż groupby
+    for position, name in zip(df.index.get_indexer(names.index), names.tolist()):
+        lists[position].append(name)
+
+
+def _coerce_numeric(values):
+    if values.dtype == object:
+        values = values.astype(str).str.strip().where(values.notna())
+    return pd.to_numeric(values, errors='coerce')
+
+
+# Wektorowy odpowiednik normalize_book dla całego DataFrame - zwraca te same słowniki
+# parametrów, a ostrzeżenia o latach i ocenach wypisuje jako podsumowania
+@metrics.stage("normalize")
+def normalize_frame(df):
+    df = df.reset_index(drop=True) if not df.index.is_unique else df
+
+    isbn_raw = df['isbn']
+    isbn = isbn_raw.astype(str).str.strip()
+    missing_isbn = isbn_raw.isna() | (isbn == '') | (isbn == 'nan')
+    if missing_isbn.any():
+        fallback = {index: _unknown_isbn(row) for index, row in df[missing_isbn].iterrows()}
+        isbn = isbn.where(~missing_isbn, pd.Series(fallback, dtype=object))
+        print(f"Ostrzeżenie: Znaleziono {int(missing_isbn.sum())} książek bez ISBN. Wygenerowano dla nich ID.")
+
+    title = df['title'].astype(str).str.strip().where(df['title'].notna(), "Nieznany tytuł")
+
+    if 'publication_date' in df.columns:
+        raw_year = df['publication_date']
+        year = _coerce_numeric(raw_year)
+        year = year.where(np.isfinite(year))
+        bad_year = raw_year.notna() & (raw_year.astype(str) != '') & year.isna()
+        if bad_year.any():
+            examples = ', '.join(isbn[bad_year].head(5))
+            print(f"Ostrzeżenie: Nie można przekonwertować roku na liczbę dla {int(bad_year.sum())} książek "
+                  f"(np. ISBN {examples}). Rok nie zostanie dodany.")
+        year = np.trunc(year).astype('Int64')
+    else:
+        year = pd.Series(pd.NA, index=df.index, dtype='Int64')
+
+    if 'num_pages' in df.columns:
+        raw_pages = df['num_pages']
+        if raw_pages.dtype == object or pd.api.types.is_string_dtype(raw_pages):
+            # int() w normalize_book przyjmuje tylko tekst z liczbą całkowitą
+            raw_pages = raw_pages.where(raw_pages.astype(str).str.fullmatch(r'\s*[+-]?\d+\s*').fillna(False).astype(bool))
+        num_pages = np.trunc(_coerce_numeric(raw_pages).replace([np.inf, -np.inf], np.nan))
+        num_pages = num_pages.fillna(0).astype('int64')
+    else:
+        num_pages = pd.Series(0, index=df.index, dtype='int64')
+
+    ratings = {}
+    bad_rating = pd.Series(False, index=df.index)
+    for column in ("rating_goodreads", "rating_amazon", "rating_google"):
+        if column in df.columns:
+            ratings[column] = _coerce_numeric(df[column])
+            bad_rating |= df[column].notna() & ratings[column].isna()
+        else:
+            ratings[column] = pd.Series(0.0, index=df.index)
+    if bad_rating.any():
+        examples = ', '.join(isbn[bad_rating].head(5))
+        print(f"Ostrzeżenie: Problem z konwersją ocen dla {int(bad_rating.sum())} książek (np. ISBN {examples}). "
+              f"Oceny nie zostaną dodane.")
+    for column in ratings:
+        ratings[column] = ratings[column].astype(object).where(ratings[column].notna() & ~bad_rating, None)
+
+    publisher = _optional_name(df, 'publisher')
+    language = _optional_name(df, 'language')
+
+    authors = [[] for _ in range(len(df))]
+    if 'authors' in df.columns:
+        _collect_names(df, _split_names(df['authors'], strip_quotes=True), authors)
+    genres = [[] for _ in range(len(df))]
+    if 'category' in df.columns:
+        _collect_names(df, _split_names(df['category'], strip_quotes=False), genres)
+
+    columns = {
+        "isbn": isbn.tolist(),
+        "title": title.tolist(),
+        "num_pages": num_pages.tolist(),
+        "year": [None if pd.isna(y) else int(y) for y in year.tolist()],
+        "rating_goodreads": ratings["rating_goodreads"].tolist(),
+        "rating_amazon": ratings["rating_amazon"].tolist(),
+        "rating_google": ratings["rating_google"].tolist(),
+        "publisher": publisher.tolist(),
+        "language": language.tolist(),
+        "authors": authors,
+        "genres": genres
+    }
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
@@ -0,0 +1,50 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+
+def book_hash(book):
+    payload = json.dumps(book, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ImportStateStore:
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS book_hashes (isbn TEXT PRIMARY KEY, hash TEXT NOT NULL)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "source TEXT PRIMARY KEY, batch INTEGER NOT NULL, total_batches INTEGER NOT NULL, "
+                "updated_at REAL NOT NULL)")
+
+    def close(self):
+        self.connection.close()
+
+    def load_hashes(self):
+        return dict(self.connection.execute("SELECT isbn, hash FROM book_hashes"))
+
+    def commit_batch(self, source, hashes, batch, total_batches):
+        # Hashe i punkt kontrolny zapisywane razem - po przerwaniu wznowienie
+        # pomija dokładnie te paczki, które trafiły już do Neo4j
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO book_hashes (isbn, hash) VALUES (?, ?)", hashes.items())
+            self.connection.execute(
+                "INSERT OR REPLACE INTO checkpoints (source, batch, total_batches, updated_at) VALUES (?, ?, ?, ?)",
+                (source, batch, total_batches, time.time()))
+
+    def remove(self, isbns):
+        with self.connection:
+            self.connection.executemany("DELETE FROM book_hashes WHERE isbn = ?", ((isbn,) for isbn in isbns))
+
+    def last_checkpoint(self, source):
+        return self.connection.execute(
+            "SELECT batch, total_batches FROM checkpoints WHERE source = ?", (source,)).fetchone()
+
+    def finish(self, source):
+        with self.connection:
+            self.connection.execute("DELETE FROM checkpoints WHERE source = ?", (source,))
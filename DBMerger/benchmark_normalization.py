@@ -0,0 +1,97 @@
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from main import DB1_BOOKS, DB1_READ_OPTIONS, DB2_BOOKS, DB2_READ_OPTIONS, DB3_BOOKS, DB3_READ_OPTIONS, read_source
+from normalization import (LANGUAGE_MAP, first_category, format_authors, map_languages, normalize_authors,
+                           normalize_titles)
+
+# Dotychczasowe implementacje jako punkt odniesienia
+LEGACY = {
+    'authors': lambda series: series.apply(format_authors),
+    'title': lambda series: series.str.replace('"', '').str.strip(),
+    'language': lambda series: series.map(LANGUAGE_MAP).fillna("Unknown"),
+    'category': lambda series: series.fillna("").str.split(",").str[0]
+}
+
+VECTORIZED = {
+    'authors': normalize_authors,
+    'title': normalize_titles,
+    'language': map_languages,
+    'category': first_category
+}
+
+
+def load_columns(rows=None):
+    # Kolumny z prawdziwych źródeł albo, gdy podano rows, z danych syntetycznych
+    if rows:
+        return synthetic_columns(rows)
+    db3 = read_source(DB3_BOOKS, **DB3_READ_OPTIONS)
+    db1 = read_source(DB1_BOOKS, **DB1_READ_OPTIONS)
+    db2 = read_source(DB2_BOOKS, **DB2_READ_OPTIONS)
+    return {
+        'authors': pd.concat([db3.get("authors"), db1.get("Book-Author"), db2.get("authors")], ignore_index=True),
+        'title': pd.concat([db3.get("title"), db1.get("Book-Title"), db2.get("title")], ignore_index=True),
+        'language': db3.get("language_code", pd.Series(dtype=object)),
+        'category': db2.get("categories", pd.Series(dtype=object))
+    }
+
+
+def synthetic_columns(rows, seed=0):
+    rng = random.Random(seed)
+    names = ["J.K. Rowling", "Stephen King", "Terry Pratchett", "Neil Gaiman", "Ursula K. Le Guin"]
+    separators = ["/", ";", ", ", " / ", ",,", ";  "]
+
+    def authors():
+        if rng.random() < 0.02:
+            return np.nan
+        picked = rng.sample(names, rng.randint(1, 3))
+        return rng.choice(separators).join(picked) + rng.choice(["", " ", ";"])
+
+    return {
+        'authors': pd.Series([authors() for _ in range(rows)]),
+        'title': pd.Series([f' "Book {i}" ' if i % 5 else f"Book {i}" for i in range(rows)]),
+        'language': pd.Series(rng.choices(list(LANGUAGE_MAP) + ["xx", np.nan], k=rows)),
+        'category': pd.Series(rng.choices(["Fiction", "Fiction,Drama", "", np.nan, "History, Europe"], k=rows))
+    }
+
+
+def benchmark(columns, repeat=3):
+    report = []
+    for name, series in columns.items():
+        if series is None:
+            continue
+        expected = LEGACY[name](series)
+        result = VECTORIZED[name](series)
+        # Porównanie tekstowe - tak jak wartości trafiają do pliku CSV
+        mismatches = int((expected.astype(object).fillna("") != result.astype(object).fillna("")).sum())
+
+        timings = {}
+        for label, function in (('legacy', LEGACY[name]), ('vectorized', VECTORIZED[name])):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                function(series)
+            timings[label] = (time.perf_counter() - started) / repeat
+
+        report.append({
+            'column': name,
+            'rows': len(series),
+            'legacy_seconds': round(timings['legacy'], 4),
+            'vectorized_seconds': round(timings['vectorized'], 4),
+            'speedup': round(timings['legacy'] / timings['vectorized'], 2) if timings['vectorized'] > 0 else None,
+            'mismatches': mismatches
+        })
+    return report
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Benchmark normalizacji kolumn DBMerger")
+    argument_parser.add_argument('--rows', type=int, help="liczba wierszy danych syntetycznych zamiast plików źródłowych")
+    argument_parser.add_argument('--repeat', type=int, default=3)
+    args = argument_parser.parse_args()
+
+    print(json.dumps(benchmark(load_columns(args.rows), args.repeat), indent=2, ensure_ascii=False))
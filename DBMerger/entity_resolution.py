@@ -0,0 +1,94 @@
+import math
+from collections import defaultdict
+
+import pandas as pd
+
+# Słowa pomijane przy porównywaniu tytułów
+STOP_WORDS = {"the", "a", "an", "and", "of"}
+
+
+def _ascii_lower(series):
+    text = series.astype(object).where(series.notna(), "").astype(str)
+    return text.str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii").str.lower()
+
+
+def _token_order(token):
+    # Stały porządek słów dla całego zbioru: najpierw dłuższe (zwykle rzadsze), żeby prefiksy nie trafiały do
+    # wielkich bloków popularnych słów
+    return -len(token), token
+
+
+def title_tokens(titles):
+    # Tytuł bez informacji o serii w nawiasach, bez znaków interpunkcyjnych i słów pomijanych
+    text = _ascii_lower(titles).str.replace(r"\([^)]*\)", " ", regex=True).str.replace(r"[^a-z0-9]+", " ", regex=True)
+    return [sorted(set(words) - STOP_WORDS or set(words), key=_token_order) for words in text.str.split()]
+
+
+def author_keys(authors):
+    # Pełne imię i nazwisko pierwszego autora bez znaków interpunkcyjnych - samo nazwisko łączyło różnych autorów
+    # (Emily i Anne Brontë, Frank i Brian Herbert)
+    first = _ascii_lower(authors).str.split(",", n=1).str[0].str.replace(r"[^a-z]+", " ", regex=True)
+    return [" ".join(words) for words in first.str.split()]
+
+
+class TitleAuthorResolver:
+    # Wykrywa duplikaty, których nie złapało porównanie ISBN (inne wydanie, błędny ISBN), po pełnym nazwisku
+    # pierwszego autora i podobieństwie Jaccarda słów tytułu. Indeks blokujący (prefix filtering): słowa tytułu
+    # są posortowane, a każdy zachowany rekord trafia do bloków (autor, słowo) tylko dla pierwszych
+    # len - ceil(threshold * len) + 1 słów. Dwa tytuły o podobieństwie >= threshold muszą mieć wspólne słowo
+    # w tych prefiksach, więc porównywane są tylko rekordy ze wspólnego bloku, a nie wszystkie pary.
+    # W bloku sprawdzanych jest najwyżej window ostatnich rekordów - koszt rośnie liniowo także dla autorów
+    # z tysiącami książek. Tytuły krótsze niż min_tokens słów (np. "Poems", "Letters") nie są porównywane.
+    # Odrzucony ISBN trafia do aliases jako alias zachowanego rekordu
+    def __init__(self, threshold=0.8, window=50, min_tokens=3):
+        self.threshold = threshold
+        self.window = window
+        self.min_tokens = min_tokens
+        self.index = defaultdict(list)
+        self.titles = []
+        self.isbns = []
+        self.aliases = {}
+        self.merged = 0
+        self.comparisons = 0
+
+    def _prefix(self, tokens):
+        return tokens[:len(tokens) - math.ceil(self.threshold * len(tokens)) + 1]
+
+    def _find_duplicate(self, author, tokens, token_set):
+        # Numer zachowanego rekordu, którego duplikatem jest tytuł, albo None
+        candidates = set()
+        for token in self._prefix(tokens):
+            candidates.update(self.index.get((author, token), ())[-self.window:])
+        for candidate in sorted(candidates):
+            self.comparisons += 1
+            other = self.titles[candidate]
+            if len(token_set & other) >= self.threshold * len(token_set | other):
+                return candidate
+        return None
+
+    def filter(self, books):
+        # Zwraca książki bez duplikatów; pierwsze wystąpienie (źródło o wyższym priorytecie) wygrywa,
+        # a zachowane rekordy zostają w indeksie dla kolejnych paczek
+        keep = []
+        for isbn, author, tokens in zip(books["isbn"], author_keys(books["authors"]), title_tokens(books["title"])):
+            if not author or len(tokens) < self.min_tokens:
+                keep.append(True)
+                continue
+            token_set = frozenset(tokens)
+            duplicate = self._find_duplicate(author, tokens, token_set)
+            if duplicate is not None:
+                self.merged += 1
+                self.aliases[isbn] = self.isbns[duplicate]
+                keep.append(False)
+                continue
+            for token in self._prefix(tokens):
+                self.index[(author, token)].append(len(self.titles))
+            self.titles.append(token_set)
+            self.isbns.append(isbn)
+            keep.append(True)
+        return books.loc[pd.Series(keep, index=books.index, dtype=bool)]
+
+    def write_aliases(self, path):
+        # Odrzucone ISBN z ISBN zachowanego rekordu - pozwala odnaleźć książkę po dowolnym z nich
+        aliases = pd.DataFrame({"isbn": list(self.aliases), "canonical_isbn": list(self.aliases.values())})
+        aliases.to_csv(path, index=False)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+# Wagi sum kontrolnych: ISBN-10 - 10..1 (mod 11), ISBN-13 - na przemian 1 i 3 (mod 10)
+ISBN10_WEIGHTS = np.arange(10, 0, -1)
+ISBN13_WEIGHTS = np.array([1, 3] * 6 + [1])
+
+
+def _digits(values, width):
+    # Macierz cyfr (n x width) z napisów o stałej długości; 'X' (tylko na końcu ISBN-10) ma wartość 10
+    if not len(values):
+        return np.empty((0, width), dtype=np.int64)
+    digits = np.frombuffer("".join(values).encode("ascii"), dtype=np.uint8).reshape(-1, width).astype(np.int64) - 48
+    digits[digits == ord("X") - 48] = 10
+    return digits
+
+
+def _isbn10_check(digits):
+    check = (11 - (digits[:, :9] @ ISBN10_WEIGHTS[:9]) % 11) % 11
+    return np.where(check == 10, "X", check.astype(str))
+
+
+def _isbn13_check(digits):
+    return ((10 - (digits[:, :12] @ ISBN13_WEIGHTS[:12]) % 10) % 10).astype(str)
+
+
+def isbn10_to_isbn13(series):
+    # Zakłada poprawne ISBN-10; prefiks 978 i nowa cyfra kontrolna
+    body = "978" + series.str[:9]
+    return body + pd.Series(_isbn13_check(_digits(body.tolist(), 12)), index=series.index)
+
+
+def isbn13_to_isbn10(series):
+    # Zakłada poprawne ISBN-13 z prefiksem 978 (dla 979 nie istnieje odpowiednik ISBN-10)
+    body = series.str[3:12]
+    return body + pd.Series(_isbn10_check(_digits(body.tolist(), 9)), index=series.index)
+
+
+def valid_isbn10(series):
+    candidates = series.str.fullmatch(r"\d{9}[\dX]").fillna(False).astype(bool)
+    valid = pd.Series(False, index=series.index)
+    digits = _digits(series[candidates].tolist(), 10)
+    valid[candidates] = (digits @ ISBN10_WEIGHTS) % 11 == 0
+    return valid
+
+
+def valid_isbn13(series):
+    candidates = series.str.fullmatch(r"97[89]\d{10}").fillna(False).astype(bool)
+    valid = pd.Series(False, index=series.index)
+    digits = _digits(series[candidates].tolist(), 13)
+    valid[candidates] = (digits @ ISBN13_WEIGHTS) % 10 == 0
+    return valid
+
+
+def canonicalize_isbns(series):
+    # Postać kanoniczna: ISBN-10, gdy istnieje (tak zapisana jest większość źródeł), w przeciwnym razie ISBN-13.
+    # Usuwane są tylko separatory (myślniki, spacje); wartości z błędną sumą kontrolną i identyfikatory
+    # niebędące ISBN (np. ASIN) zostają w pierwotnej postaci, żeby różne identyfikatory się nie skleiły
+    present = series.notna()
+    raw = series.astype(str).str.strip().str.upper()
+    cleaned = raw.str.replace(r"[\s-]+", "", regex=True)
+    # Dziewięć cyfr to zwykle ISBN-10, który stracił zero z przodu po wczytaniu jako liczba
+    nine_digits = cleaned.str.fullmatch(r"\d{9}").fillna(False).astype(bool)
+    padded = cleaned.where(~nine_digits, cleaned.str.zfill(10))
+
+    is10 = valid_isbn10(padded)
+    is13 = valid_isbn13(padded)
+    convertible = is13 & padded.str.startswith("978")
+
+    canonical = raw.where(~is13, padded)
+    canonical = canonical.where(~is10, padded)
+    canonical[convertible] = isbn13_to_isbn10(padded[convertible])
+    return canonical.where(present)
+
+
+def isbn_report(series):
+    # Podsumowanie jakości ISBN w gotowym katalogu
+    present = series.notna()
+    valid = valid_isbn10(series.where(present, "")) | valid_isbn13(series.where(present, ""))
+    return {"valid": int(valid.sum()), "invalid": int((present & ~valid).sum()), "missing": int((~present).sum())}
@@ -1,10 +1,62 @@
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 import logging
 import csv
 
-# Setup log
-logging.basicConfig(filename='../databases/merge_warnings.log', level=logging.WARNING)
+from entity_resolution import TitleAuthorResolver
+from isbn import canonicalize_isbns, isbn_report
+from normalization import first_category, map_languages, normalize_authors, normalize_titles
+
+# Wspólny schemat katalogu (book_schema.py) leży w katalogu głównym projektu
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from book_schema import BOOK_COLUMNS, BookTableWriter, is_columnar
+from instrumentation import metrics
+
+DB3_BOOKS = "../databases/db3/books.csv"
+DB1_BOOKS = "../databases/db1/books.csv"
+DB1_RATINGS = "../databases/db1/ratings.csv"
+DB2_BOOKS = "../databases/db2/books.csv"
+OUTPUT_FILE = "../databases/merged_books_final.csv"
+
+LOG_FILE = "../databases/merge_warnings.log"
+REPORT_FILE = "../databases/merge_report.json"
+
+# Opcje wczytywania źródeł: parsowane są tylko kolumny używane przy scalaniu, a kolumny tekstowe
+# mają jawny typ (ISBN zawsze jako tekst, żeby nie gubić zer z przodu). Kolumny liczbowe też są wczytywane
+# jako tekst i konwertowane w prepare_* - jedna nieliczbowa komórka nie może przerwać wczytywania źródła
+DB3_READ_OPTIONS = dict(encoding='utf-8', on_bad_lines='skip',
+                        usecols=["isbn", "title", "authors", "average_rating", "language_code", "num_pages", "publication_date", "publisher"],
+                        dtype={"isbn": str, "title": str, "authors": str, "language_code": str, "publisher": str,
+                               "average_rating": str, "num_pages": str})
+DB1_READ_OPTIONS = dict(sep=';', encoding='ISO-8859-1', on_bad_lines='skip',
+                        usecols=["ISBN", "Book-Title", "Book-Author", "Year-Of-Publication", "Publisher"],
+                        dtype={"ISBN": str, "Book-Title": str, "Book-Author": str, "Year-Of-Publication": str, "Publisher": str})
+RATINGS_READ_OPTIONS = dict(sep=';', encoding='ISO-8859-1', on_bad_lines='skip',
+                            usecols=["ISBN", "Book-Rating"], dtype={"ISBN": str})
+DB2_READ_OPTIONS = dict(encoding='ISO-8859-1', on_bad_lines='skip',
+                        usecols=["isbn10", "title", "subtitle", "authors", "num_pages", "average_rating", "categories"],
+                        dtype={"isbn10": str, "title": str, "subtitle": str, "authors": str, "categories": str,
+                               "average_rating": str, "num_pages": str})
+
+REQUIRED_COLUMNS = BOOK_COLUMNS
+
+# Kolumny tekstowe pliku tymczasowego - przy ponownym wczytaniu nie mogą zamienić się w liczby
+PARTIAL_TEXT_DTYPES = {column: str for column in ["isbn", "title", "authors", "language", "publisher", "category"]}
+
+# Waga rozkładu a priori dla średniej bayesowskiej ocen db1 (None = zwykła średnia)
+BAYESIAN_PRIOR_WEIGHT = None
+
+# Próg podobieństwa tytułów (Jaccard) przy deduplikacji po tytule i autorze (None = wyłączona)
+DUPLICATE_TITLE_THRESHOLD = 0.8
+
+# Plik z ISBN odrzuconymi przy deduplikacji po tytule i autorze, zapisywany obok pliku wynikowego
+ALIASES_FILE_NAME = "isbn_aliases.csv"
 
 def safe_read_csv(path, **kwargs):
     try:
@@ -13,122 +65,407 @@ def safe_read_csv(path, **kwargs):
         logging.warning(f"Error reading {path}: {e}")
         return pd.DataFrame()
 
+def _present_columns(path, kwargs):
+    # usecols zawężane do kolumn obecnych w nagłówku - brak opcjonalnej kolumny (np. subtitle) nie przerywa wczytywania
+    if "usecols" not in kwargs:
+        return kwargs
+    try:
+        header = pd.read_csv(path, nrows=0, **kwargs)
+    except Exception:
+        # Błąd zostanie zalogowany przy właściwym wczytywaniu
+        return kwargs
+    return dict(kwargs, usecols=[column for column in kwargs["usecols"] if column in header.columns])
+
+@metrics.stage("read")
+def read_source(path, engine="c", **kwargs):
+    kwargs = _present_columns(path, kwargs)
+    if engine == "pyarrow":
+        try:
+            return pd.read_csv(path, engine="pyarrow", **kwargs)
+        except Exception as e:
+            # Brak pakietu pyarrow albo nieobsługiwane kodowanie/opcja - wczytanie silnikiem C
+            logging.warning(f"Silnik pyarrow nie wczytał {path}, użyto silnika C: {e}")
+    return safe_read_csv(path, engine="c", low_memory=False, **kwargs)
+
+def iter_csv_chunks(path, chunksize, **kwargs):
+    # Odpowiednik safe_read_csv dla wczytywania paczkami: brak lub nieczytelny plik przed pierwszą paczką daje
+    # puste źródło, ale błąd w środku pliku przerywa scalanie - inaczej źródło zostałoby po cichu ucięte
+    kwargs = _present_columns(path, kwargs)
+    rows = 0
+    try:
+        reader = pd.read_csv(path, chunksize=chunksize, engine="c", **kwargs)
+        while True:
+            # Mierzony jest tylko czas parsowania paczki, nie przetwarzania jej przez wywołującego
+            with metrics.stage("read"):
+                chunk = next(reader, None)
+            if chunk is None:
+                break
+            rows += len(chunk)
+            metrics.count("rows_read", len(chunk))
+            yield chunk
+    except Exception as e:
+        if rows:
+            logging.error(f"Error reading {path} after {rows} rows: {e}")
+            raise
+        logging.warning(f"Error reading {path}: {e}")
+
+def aggregate_ratings(path, chunksize=500000, **kwargs):
+    # Oceny są redukowane paczkami do sumy i liczby ocen na ISBN - pamięć zależy od liczby książek, nie ocen
+    partials = []
+    for chunk in iter_csv_chunks(path, chunksize, **kwargs):
+        with metrics.stage("aggregate_ratings"):
+            chunk = chunk.rename(columns={"ISBN": "isbn", "Book-Rating": "rating"})
+            chunk["isbn"] = canonicalize_isbns(chunk["isbn"])
+            chunk["rating"] = pd.to_numeric(chunk["rating"], errors="coerce")
+            chunk = chunk.dropna(subset=["rating"])
+            partials.append(chunk.groupby("isbn")["rating"].agg(["sum", "count"]))
+
+    if not partials:
+        return pd.DataFrame(columns=["rating_sum", "rating_count"], index=pd.Index([], name="isbn"))
+
+    aggregated = pd.concat(partials).groupby(level=0).sum()
+    return aggregated.rename(columns={"sum": "rating_sum", "count": "rating_count"})
+
 def add_missing_columns(df, required_columns):
     for col in required_columns:
         if col not in df.columns:
             df[col] = np.nan
     return df
 
-def format_authors(author_str):
-    if not isinstance(author_str, str):
-        return ""
-    authors = author_str.replace(";", ",").replace("/", ",").split(",")
-    cleaned = [a.strip() for a in authors if a.strip()]
-    return ", ".join(cleaned)
-
-# Mapa języków
-LANGUAGE_MAP = {
-    "ara": "Arabic", "en-CA": "English", "eng": "English", "en-GB": "English", "enm": "English", "en-US": "English",
-    "fre": "French", "ger": "German", "gla": "Scottish Gaelic", "glg": "Galician", "grc": "Ancient Greek",
-    "ita": "Italian", "jpn": "Japanese", "lat": "Latin", "msa": "Malay", "mul": "Multiple", "nl": "Dutch",
-    "nor": "Norwegian", "por": "Portuguese", "rus": "Russian", "spa": "Spanish", "srp": "Serbian",
-    "swe": "Swedish", "tur": "Turkish", "wel": "Welsh", "zho": "Chinese"
-}
-
 # ---------------------
 # 1. db3
-books_data3 = safe_read_csv("../databases/db3/books.csv", encoding='utf-8', engine='c', on_bad_lines='skip', low_memory=False)
-
-books_data3["authors"] = books_data3["authors"].apply(format_authors)
-books_data3["title"] = books_data3["title"].str.replace('"', '').str.strip()
-books_data3["publication_date"] = pd.to_datetime(books_data3["publication_date"], errors='coerce').dt.year
+@metrics.stage("normalize")
+def prepare_db3(books_data3):
+    books_data3["average_rating"] = pd.to_numeric(books_data3["average_rating"], errors="coerce")
+    books_data3["num_pages"] = pd.to_numeric(books_data3["num_pages"], errors="coerce")
+    books_data3["authors"] = normalize_authors(books_data3["authors"])
+    books_data3["title"] = normalize_titles(books_data3["title"])
+    books_data3["publication_date"] = pd.to_datetime(books_data3["publication_date"], errors='coerce').dt.year
 
-books_data3 = books_data3[["isbn", "title", "authors", "average_rating", "language_code", "num_pages", "publication_date", "publisher"]]
-books_data3 = books_data3.rename(columns={"average_rating": "rating_goodreads", "language_code": "language"})
-books_data3["rating_google"] = books_data3["rating_goodreads"]
-books_data3["language"] = books_data3["language"].map(LANGUAGE_MAP).fillna("Unknown")
+    books_data3 = books_data3[["isbn", "title", "authors", "average_rating", "language_code", "num_pages", "publication_date", "publisher"]]
+    books_data3 = books_data3.rename(columns={"average_rating": "rating_goodreads", "language_code": "language"})
+    books_data3["isbn"] = canonicalize_isbns(books_data3["isbn"])
+    books_data3["rating_google"] = books_data3["rating_goodreads"]
+    books_data3["language"] = map_languages(books_data3["language"])
+    return add_missing_columns(books_data3, REQUIRED_COLUMNS)
 
 # ---------------------
 # 2. db1
-books1 = safe_read_csv("../databases/db1/books.csv", sep=';', engine='c', encoding='ISO-8859-1', on_bad_lines='skip', low_memory=False)
-books1 = books1[["ISBN", "Book-Title", "Book-Author", "Year-Of-Publication", "Publisher"]]
-books1 = books1.rename(columns={
-    "ISBN": "isbn",
-    "Book-Title": "title",
-    "Book-Author": "authors",
-    "Year-Of-Publication": "publication_date",
-    "Publisher": "publisher"
-})
-
-books1["authors"] = books1["authors"].apply(format_authors)
-books1["title"] = books1["title"].str.replace('"', '').str.strip()
-books1["publication_date"] = pd.to_numeric(books1["publication_date"], errors="coerce")
-books1["language"] = "Unknown"
-
-books1_filtered = books1[~books1["isbn"].isin(books_data3["isbn"])]
-
-ratings = safe_read_csv("../databases/db1/ratings.csv", sep=';', engine='c', encoding='ISO-8859-1', on_bad_lines='skip', low_memory=False)
-ratings = ratings.rename(columns={"ISBN": "isbn", "Book-Rating": "rating"})
-books_with_ratings = pd.merge(books1_filtered, ratings, on="isbn", how="left")
-books_with_ratings["rating_amazon"] = books_with_ratings["rating"].fillna(books_with_ratings["rating"].mean())
+@metrics.stage("normalize")
+def prepare_db1(books1):
+    books1 = books1[["ISBN", "Book-Title", "Book-Author", "Year-Of-Publication", "Publisher"]]
+    books1 = books1.rename(columns={
+        "ISBN": "isbn",
+        "Book-Title": "title",
+        "Book-Author": "authors",
+        "Year-Of-Publication": "publication_date",
+        "Publisher": "publisher"
+    })
+
+    books1["isbn"] = canonicalize_isbns(books1["isbn"])
+    books1["authors"] = normalize_authors(books1["authors"])
+    books1["title"] = normalize_titles(books1["title"])
+    books1["publication_date"] = pd.to_numeric(books1["publication_date"], errors="coerce")
+    books1["language"] = "Unknown"
+    return books1
+
+def rating_totals(isbns, ratings):
+    # Suma i liczba ocen wszystkich wierszy db1 - z nich liczona jest średnia dla książek bez ocen
+    matched = ratings.reindex(isbns)
+    return matched["rating_sum"].sum(), matched["rating_count"].sum()
+
+@metrics.stage("normalize")
+def rate_db1(books1, ratings, rating_mean, bayesian_weight=None):
+    books_with_ratings = books1.join(ratings, on="isbn")
+    books_with_ratings["rating_amazon_count"] = books_with_ratings["rating_count"].fillna(0).astype("int64")
+
+    if bayesian_weight:
+        # Średnia bayesowska: książki z małą liczbą ocen są przyciągane do średniej globalnej
+        books_with_ratings["rating_amazon"] = (
+            (bayesian_weight * rating_mean + books_with_ratings["rating_sum"].fillna(0))
+            / (bayesian_weight + books_with_ratings["rating_count"].fillna(0))
+        )
+    else:
+        books_with_ratings["rating_amazon"] = books_with_ratings["rating_sum"] / books_with_ratings["rating_count"]
+    books_with_ratings["rating_amazon"] = books_with_ratings["rating_amazon"].fillna(rating_mean)
+    return add_missing_columns(books_with_ratings, REQUIRED_COLUMNS)
 
 # ---------------------
 # 3. db2
-books_data2 = safe_read_csv("../databases/db2/books.csv", encoding='ISO-8859-1', engine='c', on_bad_lines='skip', low_memory=False)
+@metrics.stage("normalize")
+def prepare_db2(books_data2):
+    if 'title' in books_data2.columns and 'subtitle' in books_data2.columns:
+        books_data2["title"] = books_data2["title"].fillna("") + " " + books_data2["subtitle"].fillna("")
+    else:
+        logging.warning("Brak jednej z kolumn 'title' lub 'subtitle' w db2/books.csv.")
 
-if 'title' in books_data2.columns and 'subtitle' in books_data2.columns:
-    books_data2["title"] = books_data2["title"].fillna("") + " " + books_data2["subtitle"].fillna("")
-else:
-    logging.warning("Brak jednej z kolumn 'title' lub 'subtitle' w db2/books.csv.")
+    required_columns_db2 = ["isbn10", "title", "authors", "num_pages", "average_rating", "categories"]
+    books_data2 = books_data2[required_columns_db2]
 
-required_columns_db2 = ["isbn10", "title", "authors", "num_pages", "average_rating", "categories"]
-books_data2 = books_data2[required_columns_db2]
+    books_data2 = books_data2.rename(columns={"isbn10": "isbn", "average_rating": "rating_goodreads"})
+    books_data2["rating_goodreads"] = pd.to_numeric(books_data2["rating_goodreads"], errors="coerce")
+    books_data2["num_pages"] = pd.to_numeric(books_data2["num_pages"], errors="coerce")
+    books_data2["isbn"] = canonicalize_isbns(books_data2["isbn"])
+    books_data2["authors"] = normalize_authors(books_data2["authors"])
+    books_data2["title"] = normalize_titles(books_data2["title"])
+    books_data2["publication_date"] = np.nan
+    books_data2["language"] = "Unknown"
 
-books_data2 = books_data2.rename(columns={"isbn10": "isbn", "average_rating": "rating_goodreads"})
-books_data2["authors"] = books_data2["authors"].apply(format_authors)
-books_data2["title"] = books_data2["title"].str.replace('"', '').str.strip()
-books_data2["publication_date"] = np.nan
-books_data2["language"] = "Unknown"
+    if 'publisher' not in books_data2.columns:
+        books_data2['publisher'] = np.nan
 
-if 'publisher' not in books_data2.columns:
-    books_data2['publisher'] = np.nan
-
-if 'categories' in books_data2.columns:
-    books_data2['category'] = books_data2['categories'].fillna("").str.split(",").str[0]
-else:
-    logging.warning("Brak kolumny 'categories' w db2/books.csv.")
+    if 'categories' in books_data2.columns:
+        books_data2['category'] = first_category(books_data2['categories'])
+    else:
+        logging.warning("Brak kolumny 'categories' w db2/books.csv.")
+    return add_missing_columns(books_data2, REQUIRED_COLUMNS)
 
 # ---------------------
-# 4. Uzupełnianie braków
-required_columns = ["isbn", "title", "authors", "rating_goodreads", "language", "num_pages", "publication_date", "publisher", "rating_amazon", "rating_google", "category"]
+# 4. Uzupełnianie średnich i zapis
+@metrics.stage("finalize")
+def finalize_books(final_books, rating_amazon_mean, rating_google_mean):
+    final_books = final_books[REQUIRED_COLUMNS].copy()
+    final_books["rating_amazon"] = final_books["rating_amazon"].fillna(rating_amazon_mean)
+    final_books["rating_google"] = final_books["rating_google"].fillna(rating_google_mean)
+    final_books["rating_amazon"] = final_books["rating_amazon"].round(2)
+    final_books["rating_google"] = final_books["rating_google"].round(2)
 
-books_data3 = add_missing_columns(books_data3, required_columns)
-books_with_ratings = add_missing_columns(books_with_ratings, required_columns)
-books_data2 = add_missing_columns(books_data2, required_columns)
+    final_books["publication_date"] = final_books["publication_date"].astype("Int64")
+    final_books["num_pages"] = final_books["num_pages"].astype("Int64")
+    final_books["rating_amazon_count"] = final_books["rating_amazon_count"].astype("Int64")
 
-# ---------------------
-# 5. Łączenie i zapis
-final_books = pd.concat([books_data3, books_with_ratings, books_data2], ignore_index=True)
-final_books = final_books.drop_duplicates(subset="isbn", keep="first")
-
-final_books = final_books[["isbn", "title", "authors", "rating_goodreads", "language", "num_pages", "publication_date", "publisher", "rating_amazon", "rating_google", "category"]]
-final_books["rating_amazon"] = final_books["rating_amazon"].fillna(final_books["rating_amazon"].mean())
-final_books["rating_google"] = final_books["rating_google"].fillna(final_books["rating_google"].mean())
-final_books["rating_amazon"] = final_books["rating_amazon"].round(2)
-final_books["rating_google"] = final_books["rating_google"].round(2)
-
-# 🔐 Zapis z pełnym quotingiem tekstu
-final_books["publication_date"] = final_books["publication_date"].astype("Int64")
-final_books["num_pages"] = final_books["num_pages"].astype("Int64")
-
-final_books["category"] = final_books["category"].replace("", pd.NA).fillna("")
-
-final_books.to_csv(
-    "../databases/merged_books_final.csv",
-    index=False,
-    quoting=csv.QUOTE_MINIMAL,
-    quotechar='"',
-    na_rep='',
-    doublequote=True
-)
-print("Zapisano finalny plik: merged_books_final.csv")
+    final_books["category"] = final_books["category"].replace("", pd.NA).fillna("")
+    return final_books
+
+@metrics.stage("write")
+def write_books(final_books, output_file, header=True, mode='w'):
+    # 🔐 Zapis z pełnym quotingiem tekstu
+    final_books.to_csv(
+        output_file,
+        mode=mode,
+        header=header,
+        index=False,
+        quoting=csv.QUOTE_MINIMAL,
+        quotechar='"',
+        na_rep='',
+        doublequote=True
+    )
+
+def print_quality_report(resolver, report, output_file):
+    if resolver:
+        aliases_file = os.path.join(os.path.dirname(output_file), ALIASES_FILE_NAME)
+        resolver.write_aliases(aliases_file)
+        metrics.count("title_author_merges", resolver.merged)
+        print(f"Deduplikacja po tytule i autorze: {resolver.merged} duplikatów zapisanych jako aliasy "
+              f"w {ALIASES_FILE_NAME} (porównań: {resolver.comparisons})")
+    print(f"ISBN - poprawne: {report['valid']}, niepoprawne: {report['invalid']}, brak: {report['missing']}")
+
+def load_source(name, engine="c"):
+    # Wczytanie i normalizacja jednego źródła - zadanie dla procesu roboczego
+    if name == "ratings":
+        return aggregate_ratings(DB1_RATINGS, **RATINGS_READ_OPTIONS)
+    if name == "db1":
+        return prepare_db1(read_source(DB1_BOOKS, engine, **DB1_READ_OPTIONS))
+    if name == "db3":
+        return prepare_db3(read_source(DB3_BOOKS, engine, **DB3_READ_OPTIONS))
+    if name == "db2":
+        return prepare_db2(read_source(DB2_BOOKS, engine, **DB2_READ_OPTIONS))
+    raise ValueError(f"Nieznane źródło: {name}")
+
+def _load_source_measured(name, engine="c"):
+    # W procesie roboczym: pomiary tylko tego zadania, scalane potem w procesie głównym
+    metrics.reset()
+    return load_source(name, engine), metrics.snapshot()
+
+def _log_file():
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.FileHandler):
+            return handler.baseFilename
+    return None
+
+def _init_worker(log_file):
+    # Procesy uruchamiane metodą spawn nie dziedziczą konfiguracji logowania
+    if log_file:
+        logging.basicConfig(filename=log_file, level=logging.WARNING)
+
+def _source_pool(workers):
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(_log_file(),))
+
+def _worker_count(workers, tasks):
+    # Domyślnie tyle procesów, ile rdzeni, ale nie więcej niż zadań
+    return min(workers or os.cpu_count() or 1, tasks)
+
+def load_sources(workers=None, engine="c"):
+    # Źródła są niezależne, więc wczytywane są równolegle - największe (oceny) zlecane jest jako pierwsze
+    names = ["ratings", "db1", "db3", "db2"]
+    workers = _worker_count(workers, len(names))
+    started = time.perf_counter()
+    if workers > 1:
+        with _source_pool(workers) as executor:
+            futures = {name: executor.submit(_load_source_measured, name, engine) for name in names}
+            sources = {}
+            for name, future in futures.items():
+                sources[name], snapshot = future.result()
+                metrics.merge(snapshot)
+    else:
+        sources = {name: load_source(name, engine) for name in names}
+    print(f"Wczytano źródła w {time.perf_counter() - started:.2f} s")
+    return sources
+
+def merge_books(output_file=OUTPUT_FILE, chunksize=None, bayesian_weight=BAYESIAN_PRIOR_WEIGHT, workers=None, engine="c",
+                duplicate_threshold=DUPLICATE_TITLE_THRESHOLD):
+    if chunksize:
+        return merge_books_streaming(output_file, chunksize, bayesian_weight, workers, duplicate_threshold)
+
+    sources = load_sources(workers, engine)
+    books_data3 = sources["db3"]
+
+    books1 = sources["db1"]
+    books1_filtered = books1[~books1["isbn"].isin(books_data3["isbn"])]
+    ratings = sources["ratings"]
+    rating_sum, rating_count = rating_totals(books1_filtered["isbn"], ratings)
+    rating_mean = rating_sum / rating_count if rating_count else np.nan
+    books_with_ratings = rate_db1(books1_filtered, ratings, rating_mean, bayesian_weight)
+
+    books_data2 = sources["db2"]
+
+    final_books = pd.concat([books_data3, books_with_ratings, books_data2], ignore_index=True)
+    resolver = TitleAuthorResolver(duplicate_threshold) if duplicate_threshold else None
+    with metrics.stage("dedup"):
+        final_books = final_books.drop_duplicates(subset="isbn", keep="first")
+        if resolver:
+            final_books = resolver.filter(final_books)
+
+    final_books = finalize_books(final_books, final_books["rating_amazon"].mean(), final_books["rating_google"].mean())
+    if is_columnar(output_file):
+        with metrics.stage("write"), BookTableWriter(output_file) as writer:
+            writer.write(final_books)
+    else:
+        write_books(final_books, output_file)
+    print_quality_report(resolver, isbn_report(final_books["isbn"]), output_file)
+    metrics.count("rows_written", len(final_books))
+    print(f"Zapisano finalny plik: {os.path.basename(output_file)}")
+    return final_books
+
+class _RatingMeans:
+    # Sumy ocen zapisanych wierszy - z nich w drugim przebiegu liczone są średnie do uzupełnień
+    def __init__(self):
+        self.sums = {"rating_amazon": 0.0, "rating_google": 0.0}
+        self.counts = {"rating_amazon": 0, "rating_google": 0}
+
+    def add(self, books):
+        for column in self.sums:
+            values = pd.to_numeric(books[column], errors="coerce")
+            self.sums[column] += values.sum()
+            self.counts[column] += int(values.count())
+
+    def mean(self, column):
+        return self.sums[column] / self.counts[column] if self.counts[column] else np.nan
+
+def merge_books_streaming(output_file=OUTPUT_FILE, chunksize=100000, bayesian_weight=BAYESIAN_PRIOR_WEIGHT, workers=None,
+                          duplicate_threshold=DUPLICATE_TITLE_THRESHOLD):
+    # Pierwszy przebieg: paczki źródeł w kolejności priorytetu (db3, db1, db2) są normalizowane,
+    # odfiltrowywane zbiorem już zapisanych ISBN i dopisywane do pliku tymczasowego
+    partial_file = output_file + ".partial"
+    if os.path.exists(partial_file):
+        os.remove(partial_file)
+
+    seen = set()
+    means = _RatingMeans()
+    # Indeks blokujący rośnie razem z zapisanymi książkami, tak jak zbiór ISBN
+    resolver = TitleAuthorResolver(duplicate_threshold) if duplicate_threshold else None
+
+    def write_new(books, source):
+        with metrics.stage("dedup"):
+            books = books.drop_duplicates(subset="isbn", keep="first")
+            books = books[~books["isbn"].isin(seen)]
+            seen.update(books["isbn"])
+            if resolver:
+                books = resolver.filter(books)
+        books = books[REQUIRED_COLUMNS]
+        means.add(books)
+        with metrics.stage("write"):
+            books.to_csv(partial_file, mode='a', header=not os.path.exists(partial_file), index=False)
+        written[source] += len(books)
+        metrics.progress(sum(written.values()), label=f"zapisane książki ({source})")
+
+    written = {"db3": 0, "db1": 0, "db2": 0}
+    # Agregacja ocen nie zależy od pozostałych źródeł - liczy się w osobnym procesie w trakcie przetwarzania db3
+    executor = _source_pool(1) if _worker_count(workers, 2) > 1 else None
+    try:
+        ratings_future = executor.submit(_load_source_measured, "ratings") if executor else None
+        for chunk in iter_csv_chunks(DB3_BOOKS, chunksize, **DB3_READ_OPTIONS):
+            write_new(prepare_db3(chunk), "db3")
+        if executor:
+            ratings, snapshot = ratings_future.result()
+            metrics.merge(snapshot)
+        else:
+            ratings = load_source("ratings")
+    finally:
+        if executor:
+            executor.shutdown()
+
+    # Średnia ocen db1 zależy od wszystkich wierszy spoza db3, więc liczona jest osobno z samej kolumny ISBN
+    rating_sum = rating_count = 0
+    db1_isbn_options = dict(DB1_READ_OPTIONS, usecols=["ISBN"])
+    for chunk in iter_csv_chunks(DB1_BOOKS, chunksize, **db1_isbn_options):
+        with metrics.stage("normalize"):
+            isbns = canonicalize_isbns(chunk["ISBN"])
+            chunk_sum, chunk_count = rating_totals(isbns[~isbns.isin(seen)], ratings)
+        rating_sum += chunk_sum
+        rating_count += chunk_count
+    rating_mean = rating_sum / rating_count if rating_count else np.nan
+
+    for chunk in iter_csv_chunks(DB1_BOOKS, chunksize, **DB1_READ_OPTIONS):
+        write_new(rate_db1(prepare_db1(chunk), ratings, rating_mean, bayesian_weight), "db1")
+
+    for chunk in iter_csv_chunks(DB2_BOOKS, chunksize, **DB2_READ_OPTIONS):
+        write_new(prepare_db2(chunk), "db2")
+
+    print(f"Nowe książki - db3: {written['db3']}, db1: {written['db1']}, db2: {written['db2']}")
+
+    # Drugi przebieg: uzupełnienie braków średnimi z całego zbioru i zapis pliku końcowego
+    rating_amazon_mean = means.mean("rating_amazon")
+    rating_google_mean = means.mean("rating_google")
+    chunks = []
+    if os.path.exists(partial_file):
+        chunks = pd.read_csv(partial_file, chunksize=chunksize, dtype=PARTIAL_TEXT_DTYPES,
+                             keep_default_na=False, na_values=[""])
+    writer = BookTableWriter(output_file) if is_columnar(output_file) else None
+    header = True
+    report = Counter()
+    try:
+        for chunk in chunks:
+            final_books = finalize_books(chunk, rating_amazon_mean, rating_google_mean)
+            report.update(isbn_report(final_books["isbn"]))
+            metrics.count("rows_written", len(final_books))
+            if writer:
+                with metrics.stage("write"):
+                    writer.write(final_books)
+            else:
+                write_books(final_books, output_file, header=header, mode='w' if header else 'a')
+            header = False
+        if header:
+            empty = finalize_books(pd.DataFrame(columns=REQUIRED_COLUMNS), rating_amazon_mean, rating_google_mean)
+            if writer:
+                writer.write(empty)
+            else:
+                write_books(empty, output_file)
+    finally:
+        if writer:
+            writer.close()
+    if os.path.exists(partial_file):
+        os.remove(partial_file)
+
+    print_quality_report(resolver, report, output_file)
+    print(f"Zapisano finalny plik: {os.path.basename(output_file)}")
+
+
+if __name__ == "__main__":
+    # Setup log
+    logging.basicConfig(filename=LOG_FILE, level=logging.WARNING)
+    metrics.configure(tool="DBMerger")
+
+    # Tryb strumieniowy: źródła wczytywane paczkami, stałe zużycie pamięci niezależnie od rozmiaru danych
+    merge_books(OUTPUT_FILE, chunksize=100000)
+    metrics.write_report(REPORT_FILE)
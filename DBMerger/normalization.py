@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+# Mapa języków
+LANGUAGE_MAP = {
+    "ara": "Arabic", "en-CA": "English", "eng": "English", "en-GB": "English", "enm": "English", "en-US": "English",
+    "fre": "French", "ger": "German", "gla": "Scottish Gaelic", "glg": "Galician", "grc": "Ancient Greek",
+    "ita": "Italian", "jpn": "Japanese", "lat": "Latin", "msa": "Malay", "mul": "Multiple", "nl": "Dutch",
+    "nor": "Norwegian", "por": "Portuguese", "rus": "Russian", "spa": "Spanish", "srp": "Serbian",
+    "swe": "Swedish", "tur": "Turkish", "wel": "Welsh", "zho": "Chinese"
+}
+
+# Białe znaki wypisane jawnie: kolumny typu str (pyarrow/RE2) inaczej niż str.strip() rozumieją \s
+# (ostatnim białym znakiem Unicode jest U+3000); żaden z nich nie ma specjalnego znaczenia w [...]
+WHITESPACE = "".join(chr(code) for code in range(0x3001) if chr(code).isspace())
+
+# Separator z otaczającymi go białymi znakami i pustymi fragmentami (np. " ; , / ") zamieniany jest na ", "
+AUTHOR_SEPARATOR = f"[{WHITESPACE}]*[,;/][{WHITESPACE},;/]*"
+
+
+def format_authors(author_str):
+    if not isinstance(author_str, str):
+        return ""
+    authors = author_str.replace(";", ",").replace("/", ",").split(",")
+    cleaned = [a.strip() for a in authors if a.strip()]
+    return ", ".join(cleaned)
+
+
+def _text(series):
+    # Wartości niebędące tekstem traktowane są jak braki - tak jak w format_authors
+    if series.dtype != object and not pd.api.types.is_string_dtype(series):
+        return pd.Series(np.nan, index=series.index, dtype=object)
+    return series
+
+
+def normalize_authors(series):
+    # Wektorowy odpowiednik series.apply(format_authors)
+    # Separatory na brzegach znikają razem z białymi znakami, pozostałe są ujednolicane jednym wyrażeniem
+    authors = _text(series).str.strip(WHITESPACE + ",;/").str.replace(AUTHOR_SEPARATOR, ", ", regex=True)
+    return authors.fillna("")
+
+
+def normalize_titles(series):
+    return series.str.replace('"', '').str.strip()
+
+
+def map_languages(series):
+    # Mapowanie przez kategorie: każdy kod języka sprawdzany jest w słowniku tylko raz
+    codes = pd.Categorical(series)
+    names = np.array([LANGUAGE_MAP.get(code, "Unknown") for code in codes.categories] + ["Unknown"], dtype=object)
+    return pd.Series(names[codes.codes], index=series.index)
+
+
+def first_category(series):
+    # Odpowiednik .str.split(",").str[0] bez budowania list
+    return series.fillna("").str.replace(r"(?s),.*", "", regex=True)
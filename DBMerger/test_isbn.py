@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from isbn import canonicalize_isbns, isbn10_to_isbn13, isbn_report, valid_isbn10, valid_isbn13
+
+
+def test_checksum_validation():
+    assert valid_isbn10(pd.Series(["0306406152", "0306406153", "080442957X", "080442957Y"])).tolist() == \
+        [True, False, True, False]
+    assert valid_isbn13(pd.Series(["9780306406157", "9780306406158", "9791234567896", "1234567890128"])).tolist() == \
+        [True, False, True, False]
+
+
+def test_978_prefix_converted_to_isbn10():
+    isbns = canonicalize_isbns(pd.Series(["978-0-306-40615-7", "9780804429573", "0-306-40615-2", "306406152"]))
+    assert isbns.tolist() == ["0306406152", "080442957X", "0306406152", "0306406152"]
+    assert isbn10_to_isbn13(pd.Series(["0306406152"])).tolist() == ["9780306406157"]
+
+
+def test_979_prefix_stays_isbn13():
+    assert canonicalize_isbns(pd.Series(["979-1-234-56789-6"])).tolist() == ["9791234567896"]
+
+
+def test_non_isbn_ids_stay_distinct():
+    # ASIN i wartości z błędną sumą kontrolną nie mogą się skleić po usunięciu liter
+    ids = pd.Series(["B0000AA9ZH", "B0000AB9ZH", "0306406153", "030640615-3", "abc"])
+    assert canonicalize_isbns(ids).tolist() == ["B0000AA9ZH", "B0000AB9ZH", "0306406153", "030640615-3", "ABC"]
+
+
+def test_missing_values_preserved():
+    isbns = canonicalize_isbns(pd.Series(["0306406152", None]))
+    assert isbns.iloc[0] == "0306406152"
+    assert pd.isna(isbns.iloc[1])
+    assert isbn_report(isbns) == {"valid": 1, "invalid": 0, "missing": 1}
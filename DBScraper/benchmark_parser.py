@@ -0,0 +1,74 @@
+import argparse
+import glob
+import json
+import os
+import time
+
+from page_parser import BookPageParser
+from planner import BOOK_FIELDS
+from scrape_cache import ScrapeCache
+
+
+def load_corpus(corpus_dir=None, cache_path=None):
+    pages = []
+    if corpus_dir:
+        for path in sorted(glob.glob(os.path.join(corpus_dir, '*.html'))):
+            with open(path, encoding='utf-8') as f:
+                pages.append((os.path.basename(path), f.read()))
+    if cache_path:
+        cache = ScrapeCache(cache_path, ttl=None, max_bytes=None)
+        try:
+            isbns = [row[0] for row in cache.connection.execute("SELECT isbn FROM pages")]
+            for isbn in isbns:
+                html, _, _ = cache.get(isbn)
+                pages.append((isbn, html))
+        finally:
+            cache.close()
+    return pages
+
+
+def benchmark(pages, backend, repeat=3):
+    parser = BookPageParser(backend)
+    results = [parser.parse(html) for _, html in pages]
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for _, html in pages:
+            parser.parse(html)
+    elapsed = time.perf_counter() - started
+
+    hits = {field: sum(1 for details in results if details[field]) for field in BOOK_FIELDS}
+    return {
+        'backend': backend,
+        'pages': len(pages),
+        'pages_per_second': round(len(pages) * repeat / elapsed, 1) if elapsed > 0 else None,
+        'hit_rates': {field: round(hits[field] / len(pages), 3) if pages else None for field in BOOK_FIELDS}
+    }, results
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Benchmark parsera stron Goodreads")
+    argument_parser.add_argument('--corpus', help="katalog z zapisanymi stronami *.html")
+    argument_parser.add_argument('--cache', help="plik cache scrapera (scrape_cache.sqlite)")
+    argument_parser.add_argument('--repeat', type=int, default=3)
+    argument_parser.add_argument('--backends', default='html.parser,lxml')
+    args = argument_parser.parse_args()
+
+    pages = load_corpus(args.corpus, args.cache)
+    if not pages:
+        raise SystemExit("Brak stron do przetworzenia - podaj --corpus lub --cache")
+
+    report = []
+    reference = None
+    for backend in args.backends.split(','):
+        summary, results = benchmark(pages, backend, args.repeat)
+        # Porównanie z pierwszym backendem - wyniki powinny być identyczne
+        if reference is None:
+            reference = results
+        else:
+            mismatches = [name for (name, _), a, b in zip(pages, reference, results) if a != b]
+            summary['mismatches'] = len(mismatches)
+            summary['mismatched_pages'] = mismatches[:10]
+        report.append(summary)
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
@@ -0,0 +1,119 @@
+import queue
+import threading
+import time
+
+
+class BrowserUnavailableError(RuntimeError):
+    pass
+
+
+class DriverPool:
+    def __init__(self, size, factory, page_load_timeout=30, max_uses=200, lazy=False, max_failures=3,
+                 retry_delay=1.0):
+        self.size = size
+        self.factory = factory
+        self.page_load_timeout = page_load_timeout
+        self.max_uses = max_uses
+        # Po max_failures nieudanych uruchomieniach z rzędu pula bez działających przeglądarek zgłasza
+        # BrowserUnavailableError zamiast próbować bez końca
+        self.max_failures = max_failures
+        self.retry_delay = retry_delay
+        self.recycled = 0
+        self._idle = queue.Queue()
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._missing = 0
+        self._failures = 0
+
+        # W trybie leniwym przeglądarki startują dopiero przy pierwszym użyciu
+        if lazy:
+            self._missing = size
+        else:
+            for _ in range(size):
+                self._idle.put(self._create())
+
+    def _create(self):
+        driver = self.factory()
+        # Zawieszona strona kończy się wyjątkiem zamiast blokować wątek na zawsze
+        driver.set_page_load_timeout(self.page_load_timeout)
+        with self._lock:
+            self._uses[id(driver)] = 0
+            self._failures = 0
+        return driver
+
+    def _creation_failed(self, error):
+        with self._lock:
+            self._missing += 1
+            self._failures += 1
+            failures = self._failures
+        print(f"Nie udało się uruchomić nowej przeglądarki ({failures}/{self.max_failures}): {error}")
+        return failures
+
+    def acquire(self):
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            # Brakująca przeglądarka (leniwa lub nieodtworzona po awarii) jest uruchamiana przy braku wolnych.
+            # Po wyczerpaniu limitu prób nowe nie są uruchamiane; gdy nie działa żadna, nie ma na co czekać
+            with self._lock:
+                exhausted = self._failures >= self.max_failures
+                if exhausted and self._missing >= self.size:
+                    raise BrowserUnavailableError(f"Nie udało się uruchomić przeglądarki "
+                                                  f"({self._failures} prób z rzędu)")
+                create = self._missing > 0 and not exhausted
+                if create:
+                    self._missing -= 1
+            if not create:
+                try:
+                    return self._idle.get(timeout=1)
+                except queue.Empty:
+                    continue
+            try:
+                return self._create()
+            except Exception as e:
+                failures = self._creation_failed(e)
+                if failures < self.max_failures:
+                    time.sleep(self.retry_delay * 2 ** (failures - 1))
+
+    def release(self, driver, broken=False):
+        with self._lock:
+            self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+            worn_out = self._uses[id(driver)] >= self.max_uses
+
+        if broken or worn_out:
+            self._discard(driver)
+            if self._closed:
+                return
+            try:
+                driver = self._create()
+            except Exception as e:
+                self._creation_failed(e)
+                return
+            with self._lock:
+                self.recycled += 1
+
+        if self._closed:
+            self._discard(driver)
+        else:
+            self._idle.put(driver)
+
+    def _discard(self, driver):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
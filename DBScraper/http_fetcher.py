@@ -0,0 +1,101 @@
+import os
+import random
+import sys
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from instrumentation import metrics
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                  'Chrome/124.0 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.9'
+}
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    # Wspólny dla wszystkich wątków limit zapytań na sekundę (kolejne sloty co 1/rate s)
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class FetchStats:
+    def __init__(self):
+        self.http = 0
+        self.http_failed = 0
+        self.fallback = 0
+        self.cached = 0
+        self._lock = threading.Lock()
+
+    def add(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+        metrics.count(f"pages_{name}")
+
+    def report(self):
+        print(f"Z cache: {self.cached}, pobrano przez HTTP: {self.http}, przez przeglądarkę: {self.fallback}, "
+              f"nieudane zapytania HTTP: {self.http_failed}")
+
+
+class HttpBookFetcher:
+    def __init__(self, base_url='https://www.goodreads.com', rate_limiter=None, retries=3, backoff=0.5,
+                 timeout=15, pool_size=10):
+        self.base_url = base_url.rstrip('/')
+        self.rate_limiter = rate_limiter or RateLimiter(None)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        # Jedna sesja z pulą połączeń współdzielona przez wszystkie wątki
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def fetch(self, isbn):
+        url = f'{self.base_url}/search'
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.wait()
+            try:
+                with metrics.latency("http_request", stage="fetch"):
+                    response = self.session.get(url, params={'q': isbn}, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.text
+                error = f"HTTP {response.status_code}"
+            except requests.HTTPError as e:
+                metrics.log(f"Błąd HTTP dla ISBN {isbn}: {e}")
+                return None
+            except requests.RequestException as e:
+                error = str(e)
+
+            if attempt < self.retries:
+                delay = self.backoff * (2 ** attempt) * (1 + random.random())
+                metrics.count("http_retries")
+                metrics.log(f"Ponowienie zapytania dla ISBN {isbn} za {delay:.2f} s ({error})")
+                time.sleep(delay)
+
+        metrics.log(f"Nie udało się pobrać strony dla ISBN {isbn}: {error}")
+        return None
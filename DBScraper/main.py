@@ -1,112 +1,214 @@
+import os
+import sys
 import time
-import requests
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
 import pandas as pd
-import re
 
+from driver_pool import BrowserUnavailableError, DriverPool
+from http_fetcher import FetchStats, HttpBookFetcher, RateLimiter
+from page_parser import BookPageParser
+from planner import BOOK_FIELDS, plan_scrape
+from scrape_cache import ScrapeCache
+from stream_output import StreamingOutput
 
-def get_book_details(isbn):
-    url = f'https://www.goodreads.com/search?q={isbn}'
+# Wspólny schemat katalogu (book_schema.py) leży w katalogu głównym projektu
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from book_schema import read_books
+from instrumentation import VERBOSE, metrics
 
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()))
-    driver.get(url)
+# Pola widoczne dopiero po rozwinięciu 'Book details and editions' - wymagają przeglądarki
+BROWSER_ONLY_FIELDS = ['language']
 
-    # Czekaj na załadowanie strony
-    time.sleep(1)
 
-    try:
-        # Zamknij pop-up
-        close_button = driver.find_element(By.CSS_SELECTOR,
-                                           "button.Button--tertiary.Button--medium.Button--rounded[aria-label='Close']")
-        close_button.click()
-        time.sleep(1)
-    except:
-        print("Pop-up nie został zamknięty.")
+# Sterownik jest pobierany tylko raz na cały proces
+@functools.lru_cache(maxsize=None)
+def chromedriver_path():
+    return ChromeDriverManager().install()
 
-    # Kliknij przycisk rozwijający szczegóły książki, aby załadować dodatkowe dane
-    try:
-        details_button = driver.find_element(By.CSS_SELECTOR, "button[aria-label='Book details and editions']")
-        details_button.click()
-        time.sleep(2)
-    except:
-        print("Nie udało się kliknąć przycisku 'Book details & editions'.")
 
-    # Pobierz HTML strony po załadowaniu szczegółów
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
+def create_driver(headless=True):
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument('--headless=new')
+        options.add_argument('--window-size=1920,1080')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    return webdriver.Chrome(service=Service(chromedriver_path()), options=options)
 
-    book_details = {}
 
-    # Pobierz ocenę Goodreads
-    try:
-        book_details['rating_goodreads'] = soup.select_one("div.RatingStatistics__rating").text.strip()
-    except AttributeError:
-        book_details['rating_goodreads'] = None
+def get_book_details(isbn, driver=None, base_url='https://www.goodreads.com'):
+    return parse_book_page(load_book_page(isbn, driver, base_url))
 
-    # Pobierz autorów
-    try:
-        authors = soup.select("span.ContributorLink__name")
-        book_details['authors'] = ', '.join([author.text.strip() for author in authors])
-    except AttributeError:
-        book_details['authors'] = None
 
-    # Pobierz kategorię
-    try:
-        categories = soup.select("span.BookPageMetadataSection__genreButton a.Button")
-        book_details['category'] = ', '.join([category.text.strip() for category in categories])
-    except AttributeError:
-        book_details['category'] = None
+def load_book_page(isbn, driver=None, base_url='https://www.goodreads.com', expand_details=True):
+    url = f'{base_url}/search?q={isbn}'
+
+    own_driver = driver is None
+    if own_driver:
+        driver = create_driver(headless=False)
+
+    # Czas od żądania strony do pobrania HTML, łącznie z oczekiwaniem i rozwijaniem szczegółów
+    with metrics.latency("browser_load", stage="fetch"):
+        driver.get(url)
+
+        # Czekaj na załadowanie strony
+        time.sleep(1)
 
-    # Pobierz liczbę stron
-    try:
-        num_pages_text = soup.select_one('p[data-testid="pagesFormat"]').text.strip().split()[0]
         try:
-            book_details['num_pages'] = int(float(num_pages_text))
-        except ValueError:
-            book_details['num_pages'] = None
-    except AttributeError:
-        book_details['num_pages'] = None
+            # Zamknij pop-up
+            close_button = driver.find_element(By.CSS_SELECTOR,
+                                               "button.Button--tertiary.Button--medium.Button--rounded[aria-label='Close']")
+            close_button.click()
+            time.sleep(1)
+        except:
+            metrics.log("Pop-up nie został zamknięty.")
 
-    # Pobierz datę publikacji i wydawnictwo
-    try:
-        publication_info = soup.select_one('p[data-testid="publicationInfo"]').text.strip()
+        # Kliknij przycisk rozwijający szczegóły książki, aby załadować dodatkowe dane
+        if expand_details:
+            try:
+                details_button = driver.find_element(By.CSS_SELECTOR, "button[aria-label='Book details and editions']")
+                details_button.click()
+                time.sleep(2)
+            except:
+                metrics.log("Nie udało się kliknąć przycisku 'Book details & editions'.")
 
-        publication_date = re.sub(r'^(First published|Published)\s+', '', publication_info)
+        # Pobierz HTML strony po załadowaniu szczegółów
+        page_source = driver.page_source
 
-        year_match = re.search(r'\b\d{4}\b', publication_date)
-        if year_match:
-            book_details['publication_date'] = int(year_match.group())
-        else:
-            book_details['publication_date'] = None
+    if own_driver:
+        driver.quit()
+    return page_source
 
-        # Wydawnictwo
-        book_details['publisher'] = publication_info.split('by')[-1].strip() if 'by' in publication_info else None
-    except AttributeError:
-        book_details['publication_date'] = book_details['publisher'] = None
 
-    # Pobierz język
-    try:
-        language_tag = soup.select_one("dt:contains('Language') + dd div.TruncatedContent__text")
-        book_details['language'] = language_tag.text.strip() if language_tag else None
-    except AttributeError:
-        book_details['language'] = None
+# Wspólny parser dla obu ścieżek pobierania
+PAGE_PARSER = BookPageParser()
+
+
+@metrics.stage("parse")
+def parse_book_page(html):
+    return PAGE_PARSER.parse(html)
 
-    driver.quit()
+
+def _scrape_with_pool(pool, isbn, retries, rate_limiter, base_url, expand_details):
+    for attempt in range(retries + 1):
+        try:
+            driver = pool.acquire()
+        except BrowserUnavailableError as e:
+            # Bez przeglądarki ISBN zostaje z pustymi danymi (lub tylko z danymi z HTTP)
+            metrics.count("browser_unavailable")
+            metrics.log(f"Pominięto przeglądarkę dla ISBN {isbn}: {e}")
+            break
+        try:
+            rate_limiter.wait()
+            html = load_book_page(isbn, driver, base_url, expand_details)
+        except Exception as e:
+            # Przeglądarka padła lub zawisła - zastąp ją nową i spróbuj ponownie. Poza WebDriverException
+            # martwy chromedriver zgłasza też błędy połączenia urllib3 (MaxRetryError, ProtocolError)
+            pool.release(driver, broken=True)
+            metrics.count("browser_errors")
+            metrics.log(f"Błąd przeglądarki dla ISBN {isbn} (próba {attempt + 1}/{retries + 1}): {e}")
+            continue
+        pool.release(driver)
+        return html, parse_book_page(html)
+
+    return None, {field: None for field in BOOK_FIELDS}
+
+
+def _has_book_data(details):
+    # Strona bez żadnego pola książki to zwykle blokada dla botów, captcha albo lista wyników wyszukiwania
+    return any(value is not None and value != "" for value in details.values())
+
+
+def _scrape_one(isbn, fields, pool, fetcher, stats, retries, rate_limiter, base_url, cache, reparse_cache):
+    # Przeglądarka jest potrzebna tylko dla brakujących pól z sekcji szczegółów
+    browser_fields = [field for field in BROWSER_ONLY_FIELDS if field in fields]
+
+    if cache is not None:
+        entry = cache.get(isbn)
+        # Wpis bez potrzebnych pól ze szczegółów mógł powstać bez ich rozwijania - pobierz ponownie. Strona pobrana
+        # z rozwiniętymi szczegółami jest ostateczna, także gdy danego pola na niej nie ma (np. brak języka)
+        if entry is not None and (entry[2] or all(entry[1].get(field) is not None for field in browser_fields)):
+            html, book_details, _ = entry
+            # Po zmianie selektorów dane są odtwarzane z zapisanego HTML bez ponownego pobierania
+            if reparse_cache:
+                book_details = parse_book_page(html)
+                cache.update_details(isbn, book_details)
+            stats.add('cached')
+            return book_details
+
+    metrics.log(f"Pobieranie danych dla ISBN: {isbn}")
+
+    # Szybka ścieżka: statyczny HTML przez wspólną sesję HTTP
+    http_details = None
+    if fetcher is not None:
+        html = fetcher.fetch(isbn)
+        if html is not None:
+            http_details = parse_book_page(html)
+        if http_details is None or not _has_book_data(http_details):
+            # Taka strona nie trafia do cache - inaczej byłaby zwracana przy każdym kolejnym uruchomieniu
+            http_details = None
+            stats.add('http_failed')
+        elif all(http_details[field] is not None for field in browser_fields):
+            stats.add('http')
+            if cache is not None:
+                cache.put(isbn, html, http_details)
+            return http_details
+
+    stats.add('fallback')
+    html, book_details = _scrape_with_pool(pool, isbn, retries, rate_limiter, base_url, bool(browser_fields))
+    if http_details:
+        for field in BOOK_FIELDS:
+            if not book_details.get(field) and http_details[field]:
+                book_details[field] = http_details[field]
+    if cache is not None and html is not None and _has_book_data(book_details):
+        cache.put(isbn, html, book_details, expanded=bool(browser_fields))
     return book_details
 
 
-# Wczytanie pliku CSV
-df = pd.read_csv('../databases/bookstest.csv', dtype={'isbn': str})
+# Pobiera dane dla wielu ISBN równolegle i zwraca je kolejno, w tej samej kolejności co wejście
+def iter_scrape_books(isbns, workers=4, retries=1, headless=True, http_first=True, rate_limit=2.0,
+                      base_url='https://www.goodreads.com', cache_path=None, cache_ttl=30 * 24 * 3600,
+                      cache_max_bytes=500 * 1024 * 1024, reparse_cache=False, needed=None):
+    rate_limiter = RateLimiter(rate_limit)
+    stats = FetchStats()
+    cache = ScrapeCache(cache_path, ttl=cache_ttl, max_bytes=cache_max_bytes) if cache_path else None
+    fetcher = HttpBookFetcher(base_url, rate_limiter=rate_limiter, pool_size=workers) if http_first else None
+    # Przy ścieżce HTTP lub cache przeglądarki są uruchamiane dopiero, gdy będą potrzebne
+    pool = DriverPool(workers, functools.partial(create_driver, headless=headless),
+                      lazy=http_first or cache is not None)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(
+                lambda isbn: _scrape_one(isbn, needed.get(isbn, BOOK_FIELDS) if needed else BOOK_FIELDS,
+                                         pool, fetcher, stats, retries, rate_limiter, base_url,
+                                         cache, reparse_cache), isbns)
+    finally:
+        stats.report()
+        if pool.recycled:
+            print(f"Przeglądarki uruchomione ponownie: {pool.recycled}")
+        pool.close()
+        if fetcher is not None:
+            fetcher.close()
+        if cache is not None:
+            cache.close()
+
+
+def scrape_books(isbns, **kwargs):
+    return list(iter_scrape_books(isbns, **kwargs))
 
 
 # Funkcja do uzupełniania brakujących danych i wypisania wyników na terminalu
-def fill_missing_data(row):
-    isbn = str(row['isbn']).zfill(10)
-    print(f"Pobieranie danych dla ISBN: {isbn}")
-    book_details = get_book_details(isbn)
+def fill_missing_data(row, book_details=None):
+    if book_details is None:
+        isbn = str(row['isbn']).zfill(10)
+        metrics.log(f"Pobieranie danych dla ISBN: {isbn}")
+        book_details = get_book_details(isbn)
 
     # Uzupełnianie brakujących danych w kolumnach
     if pd.isna(row['authors']) and book_details['authors']:
@@ -124,7 +226,14 @@ def fill_missing_data(row):
     if pd.isna(row['category']) and book_details['category']:
         row['category'] = book_details['category']
 
-    # Wypisywanie danych na terminalu
+    print_book(row)
+    return row
+
+
+# Wypisywanie danych na terminalu - tylko przy poziomie VERBOSE, przy zwykłym wystarcza linia postępu
+def print_book(row):
+    if not metrics.enabled(VERBOSE):
+        return
     print(f"ISBN: {row['isbn']}")
     print(f"Title: {row['title']}")
     print(f"Authors: {row['authors']}")
@@ -136,24 +245,40 @@ def fill_missing_data(row):
     print(f"Category: {row['category']}")
     print("=" * 50)
 
-    return row
-
-
-# Uzupełnianie danych w całym DataFrame
-df = df.apply(fill_missing_data, axis=1)
-
-# Konwersja do liczb, z NaN jeśli nie parsowalne
-df['publication_date'] = pd.to_numeric(df['publication_date'], errors='coerce')
-df['num_pages'] = pd.to_numeric(df['num_pages'], errors='coerce')
-
-# Konwersja do typu Int64 (nullable int), żeby nie było .0 w CSV
-df['publication_date'] = df['publication_date'].astype('Int64')
-df['num_pages'] = df['num_pages'].astype('Int64')
-
-# ISBN jako string (dla zer z przodu)
-df['isbn'] = df['isbn'].astype(str)
-
-# Zapis do pliku CSV
-df.to_csv('../databases/bookstest_final_updated.csv', index=False)
 
-print("Dane zostały zapisane do pliku 'bookstest_final_updated.csv'.")
\ No newline at end of file
+if __name__ == "__main__":
+    metrics.configure(tool="DBScraper")
+
+    # Wczytanie katalogu - CSV albo plik kolumnowy (.parquet/.arrow) z DBMerger
+    with metrics.stage("read"):
+        df = read_books('../databases/bookstest.csv')
+
+    # Pobranie danych tylko dla ISBN z brakami i tylko potrzebnych pól
+    plan = plan_scrape(df)
+
+    # Wyniki dopisywane są do pliku paczkami; ISBN z dziennika są pomijane po restarcie
+    output = StreamingOutput('../databases/bookstest_final_updated.csv')
+    done = output.done_isbns()
+    pending = [isbn for isbn in plan.isbns if isbn not in done]
+    if done:
+        print(f"Wznawianie: pominięto {len(plan.isbns) - len(pending)} już pobranych ISBN")
+
+    batch = []
+    for number, (isbn, book_details) in enumerate(zip(pending, iter_scrape_books(
+            pending, workers=4, needed=plan.needed, cache_path='../databases/scrape_cache.sqlite')), start=1):
+        batch.append((isbn, book_details))
+        metrics.progress(number, len(pending), label="pobrane ISBN")
+        if len(batch) >= 25:
+            with metrics.stage("write"):
+                output.write_batch(df, plan, batch).apply(print_book, axis=1)
+            batch = []
+    if batch:
+        with metrics.stage("write"):
+            output.write_batch(df, plan, batch).apply(print_book, axis=1)
+
+    # Kompaktowanie: przywrócenie kolejności wierszy, konwersje Int64 i zapis pliku końcowego
+    with metrics.stage("write"):
+        output.compact(df)
+
+    print("Dane zostały zapisane do pliku 'bookstest_final_updated.csv'.")
+    metrics.write_report('../databases/scrape_report.json')
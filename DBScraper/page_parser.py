@@ -0,0 +1,117 @@
+import re
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    lxml_html = None
+
+YEAR_PATTERN = re.compile(r'\b\d{4}\b')
+PUBLISHED_PREFIX = re.compile(r'^(First published|Published)\s+')
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Selektory CSS dla BeautifulSoup - kompilowane raz, a nie przy każdej stronie
+CSS_SELECTORS = {
+    'rating_goodreads': soupsieve.compile("div.RatingStatistics__rating"),
+    'authors': soupsieve.compile("span.ContributorLink__name"),
+    'category': soupsieve.compile("span.BookPageMetadataSection__genreButton a.Button"),
+    'num_pages': soupsieve.compile('p[data-testid="pagesFormat"]'),
+    'publication_info': soupsieve.compile('p[data-testid="publicationInfo"]'),
+    'language': soupsieve.compile("dt:-soup-contains('Language') + dd div.TruncatedContent__text")
+}
+
+# Te same selektory jako XPath dla lxml
+XPATH_EXPRESSIONS = {
+    'rating_goodreads': f"//div[{_has_class('RatingStatistics__rating')}]",
+    'authors': f"//span[{_has_class('ContributorLink__name')}]",
+    'category': f"//span[{_has_class('BookPageMetadataSection__genreButton')}]//a[{_has_class('Button')}]",
+    'num_pages': "//p[@data-testid='pagesFormat']",
+    'publication_info': "//p[@data-testid='publicationInfo']",
+    # Zamiast przeszukiwać tekst całego drzewa, sprawdzane są tylko elementy dt
+    'language': f"//dt[contains(., 'Language')]/following-sibling::*[1][self::dd]"
+                f"//div[{_has_class('TruncatedContent__text')}]"
+}
+
+XPATH_SELECTORS = {} if lxml_html is None else {
+    name: etree.XPath(expression) for name, expression in XPATH_EXPRESSIONS.items()
+}
+
+
+class BookPageParser:
+    def __init__(self, backend='auto'):
+        if backend == 'auto':
+            backend = 'lxml' if lxml_html is not None else 'html.parser'
+        if backend == 'lxml' and lxml_html is None:
+            raise ValueError("Backend 'lxml' wymaga zainstalowanego pakietu lxml")
+        self.backend = backend
+
+    def parse(self, html):
+        if self.backend == 'lxml':
+            texts = self._extract_lxml(html)
+        else:
+            texts = self._extract_soup(html)
+        return self._build_details(texts)
+
+    def _extract_lxml(self, html):
+        if not html or not html.strip():
+            return {name: [] for name in XPATH_SELECTORS}
+        try:
+            tree = lxml_html.fromstring(html)
+        except ValueError:
+            # lxml nie przyjmuje tekstu z deklaracją kodowania - wtedy parsuje bajty
+            tree = lxml_html.fromstring(html.encode('utf-8'))
+        return {name: [element.text_content() for element in selector(tree)]
+                for name, selector in XPATH_SELECTORS.items()}
+
+    def _extract_soup(self, html):
+        soup = BeautifulSoup(html, self.backend)
+        texts = {}
+        for name, selector in CSS_SELECTORS.items():
+            if name in ('authors', 'category'):
+                texts[name] = [element.text for element in selector.select(soup)]
+            else:
+                element = selector.select_one(soup)
+                texts[name] = [element.text] if element is not None else []
+        return texts
+
+    def _build_details(self, texts):
+        book_details = {}
+
+        # Ocena Goodreads
+        rating = texts['rating_goodreads']
+        book_details['rating_goodreads'] = rating[0].strip() if rating else None
+
+        # Autorzy i kategorie
+        book_details['authors'] = ', '.join([author.strip() for author in texts['authors']])
+        book_details['category'] = ', '.join([category.strip() for category in texts['category']])
+
+        # Liczba stron
+        book_details['num_pages'] = None
+        if texts['num_pages']:
+            words = texts['num_pages'][0].strip().split()
+            try:
+                book_details['num_pages'] = int(float(words[0])) if words else None
+            except ValueError:
+                pass
+
+        # Data publikacji i wydawnictwo
+        book_details['publication_date'] = book_details['publisher'] = None
+        if texts['publication_info']:
+            publication_info = texts['publication_info'][0].strip()
+            year_match = YEAR_PATTERN.search(PUBLISHED_PREFIX.sub('', publication_info))
+            book_details['publication_date'] = int(year_match.group()) if year_match else None
+            book_details['publisher'] = publication_info.split('by')[-1].strip() if 'by' in publication_info else None
+
+        # Język
+        language = texts['language']
+        book_details['language'] = language[0].strip() if language else None
+
+        # Kolejność kluczy taka sama jak w dotychczasowym parse_book_page
+        return {field: book_details[field] for field in
+                ['rating_goodreads', 'authors', 'category', 'num_pages', 'publication_date', 'publisher', 'language']}
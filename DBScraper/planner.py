@@ -0,0 +1,49 @@
+import pandas as pd
+
+BOOK_FIELDS = ['rating_goodreads', 'authors', 'category', 'num_pages', 'publication_date', 'publisher', 'language']
+
+
+class ScrapePlan:
+    def __init__(self, row_isbns, row_mask, needed):
+        self.row_isbns = row_isbns
+        self.row_mask = row_mask
+        self.needed = needed
+        self.isbns = list(needed)
+
+
+def _missing_mask(df):
+    # Brakująca kolumna traktowana jest jak kolumna samych braków
+    return pd.DataFrame({field: df[field].isna() if field in df.columns else True for field in BOOK_FIELDS},
+                        index=df.index)
+
+
+def plan_scrape(df):
+    row_isbns = df['isbn'].astype(str).str.zfill(10)
+    missing = _missing_mask(df)
+    row_mask = missing.any(axis=1)
+
+    # Zbiór potrzebnych pól dla każdego ISBN to suma braków we wszystkich jego wierszach
+    needed_by_isbn = missing[row_mask].groupby(row_isbns[row_mask], sort=False).any()
+    needed = {isbn: [field for field in BOOK_FIELDS if flags[field]]
+              for isbn, flags in zip(needed_by_isbn.index, needed_by_isbn.to_dict('records'))}
+
+    avoided = len(df) - len(needed)
+    print(f"Planowanie: {int(row_mask.sum())} z {len(df)} wierszy ma braki, "
+          f"{len(needed)} unikalnych ISBN do pobrania, pominięto {avoided} pobrań")
+    return ScrapePlan(row_isbns, row_mask, needed)
+
+
+def apply_results(df, plan, results):
+    df = df.copy()
+    details = pd.DataFrame(results, index=plan.isbns, columns=BOOK_FIELDS)
+
+    for field in BOOK_FIELDS:
+        if field not in df.columns:
+            df[field] = pd.NA
+        values = plan.row_isbns.map(details[field]) if len(details) else pd.Series(None, index=df.index)
+        # Tak jak w fill_missing_data: tylko brakujące pola i tylko niepuste wyniki
+        usable = values.notna() & values.astype(bool)
+        fill = df[field].isna() & plan.row_mask & usable
+        if fill.any():
+            df[field] = df[field].astype(object).where(~fill, values)
+    return df
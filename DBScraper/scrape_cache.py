@@ -0,0 +1,95 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from instrumentation import metrics
+
+
+class ScrapeCache:
+    def __init__(self, path, ttl=30 * 24 * 3600, max_bytes=500 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "isbn TEXT PRIMARY KEY, html BLOB NOT NULL, details TEXT NOT NULL, "
+                "fetched_at REAL NOT NULL, last_access REAL NOT NULL, size INTEGER NOT NULL, "
+                "expanded INTEGER NOT NULL DEFAULT 0)")
+            # Cache z wcześniejszej wersji - wpisy bez tej informacji traktowane są jak nierozwinięte
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(pages)")]
+            if "expanded" not in columns:
+                self.connection.execute("ALTER TABLE pages ADD COLUMN expanded INTEGER NOT NULL DEFAULT 0")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+        # Bieżący rozmiar cache liczony raz i aktualizowany przy zapisie i usuwaniu - bez skanowania tabeli przy put
+        self._bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+    def get(self, isbn):
+        # Zwraca (html, dane, expanded) - expanded oznacza stronę pobraną z rozwiniętą sekcją szczegółów
+        now = time.time()
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT html, details, fetched_at, expanded, size FROM pages WHERE isbn = ?", (isbn,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and now - row[2] > self.ttl:
+                with self.connection:
+                    self.connection.execute("DELETE FROM pages WHERE isbn = ?", (isbn,))
+                self._bytes -= row[4]
+                return None
+            with self.connection:
+                self.connection.execute("UPDATE pages SET last_access = ? WHERE isbn = ?", (now, isbn))
+        return zlib.decompress(row[0]).decode('utf-8'), json.loads(row[1]), bool(row[3])
+
+    def put(self, isbn, html, details, expanded=False):
+        now = time.time()
+        compressed = zlib.compress(html.encode('utf-8'), 6)
+        with self._lock:
+            # Zastępowany wpis (ponowne pobranie) przestaje się liczyć do rozmiaru
+            previous = self.connection.execute("SELECT size FROM pages WHERE isbn = ?", (isbn,)).fetchone()
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO pages (isbn, html, details, fetched_at, last_access, size, expanded) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (isbn, compressed, json.dumps(details), now, now, len(compressed), int(expanded)))
+            self._bytes += len(compressed) - (previous[0] if previous else 0)
+            self._evict()
+
+    def update_details(self, isbn, details):
+        with self._lock:
+            with self.connection:
+                self.connection.execute("UPDATE pages SET details = ? WHERE isbn = ?", (json.dumps(details), isbn))
+
+    def _evict(self, batch=64):
+        # Najdawniej używane wpisy są usuwane, dopóki cache nie zmieści się w limicie; ofiary wybierane są
+        # małymi porcjami z indeksu last_access zamiast wczytywania całej tabeli
+        if self.max_bytes is None or self._bytes <= self.max_bytes:
+            return
+        evicted = 0
+        with self.connection:
+            while self._bytes > self.max_bytes:
+                victims = self.connection.execute(
+                    "SELECT isbn, size FROM pages ORDER BY last_access LIMIT ?", (batch,)).fetchall()
+                if not victims:
+                    self._bytes = 0
+                    break
+                for isbn, size in victims:
+                    if self._bytes <= self.max_bytes:
+                        break
+                    self.connection.execute("DELETE FROM pages WHERE isbn = ?", (isbn,))
+                    self._bytes -= size
+                    evicted += 1
+        # Przy pełnym cache dzieje się to przy każdym zapisie - komunikat tylko przy poziomie VERBOSE
+        metrics.count("cache_evictions", evicted)
+        metrics.log(f"Cache: usunięto {evicted} najdawniej używanych stron")
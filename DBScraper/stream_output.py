@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pandas as pd
+
+from planner import ScrapePlan, apply_results
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from book_schema import BookTableWriter, is_columnar
+
+
+class StreamingOutput:
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.partial_path = output_path + '.partial'
+        self.journal_path = output_path + '.journal'
+
+    def done_isbns(self):
+        if not os.path.exists(self.journal_path):
+            return set()
+        with open(self.journal_path, encoding='utf-8') as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def write_batch(self, df, plan, batch):
+        isbns = [isbn for isbn, _ in batch]
+        rows = plan.row_mask & plan.row_isbns.isin(isbns)
+        batch_plan = ScrapePlan(plan.row_isbns[rows], plan.row_mask[rows], {isbn: plan.needed[isbn] for isbn in isbns})
+        enriched = apply_results(df[rows], batch_plan, [details for _, details in batch])
+
+        # Najpierw wiersze, potem dziennik - po awarii między nimi paczka zostanie
+        # pobrana ponownie, a kompaktowanie zachowa ostatnią wersję wiersza
+        header = not os.path.exists(self.partial_path)
+        with open(self.partial_path, 'a', newline='', encoding='utf-8') as f:
+            enriched.to_csv(f, header=header, index_label='_row')
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(f"{isbn}\n" for isbn in isbns))
+            f.flush()
+            os.fsync(f.fileno())
+        return enriched
+
+    def compact(self, df):
+        df = df.copy()
+        if os.path.exists(self.partial_path):
+            partial = pd.read_csv(self.partial_path, dtype=str, index_col='_row')
+            partial.index = partial.index.astype(int)
+            partial = partial[~partial.index.duplicated(keep='last')]
+            for column in partial.columns:
+                df[column] = df[column].astype(object)
+                df.loc[partial.index, column] = partial[column]
+
+        # Konwersja do liczb, z NaN jeśli nie parsowalne
+        df['publication_date'] = pd.to_numeric(df['publication_date'], errors='coerce')
+        df['num_pages'] = pd.to_numeric(df['num_pages'], errors='coerce')
+
+        # Konwersja do typu Int64 (nullable int), żeby nie było .0 w CSV
+        df['publication_date'] = df['publication_date'].astype('Int64')
+        df['num_pages'] = df['num_pages'].astype('Int64')
+
+        # ISBN jako string (dla zer z przodu)
+        df['isbn'] = df['isbn'].astype(str)
+
+        if is_columnar(self.output_path):
+            with BookTableWriter(self.output_path) as writer:
+                writer.write(df)
+        else:
+            df.to_csv(self.output_path, index=False)
+
+        for path in (self.partial_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+        return df
@@ -0,0 +1,201 @@
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Wspólny schemat katalogu książek przekazywanego między DBMerger, DBScraper i DBCreator
+BOOK_COLUMNS = ["isbn", "title", "authors", "rating_goodreads", "language", "num_pages", "publication_date",
+                "publisher", "rating_amazon", "rating_amazon_count", "rating_google", "category"]
+
+TEXT_COLUMNS = ["isbn", "title", "authors"]
+# Kolumny o małej liczbie różnych wartości - zapisywane jako słowniki (kategorie)
+CATEGORY_COLUMNS = ["language", "publisher", "category"]
+INT_COLUMNS = ["num_pages", "publication_date", "rating_amazon_count"]
+FLOAT_COLUMNS = ["rating_goodreads", "rating_amazon", "rating_google"]
+
+# Parquet - kompresja i zgodność z innymi narzędziami; Arrow IPC (.arrow/.feather) - mapowanie pliku w pamięć bez kopiowania
+COLUMNAR_EXTENSIONS = ('.parquet', '.arrow', '.feather')
+
+
+def is_columnar(path):
+    return os.path.splitext(path)[1].lower() in COLUMNAR_EXTENSIONS
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ValueError("Formaty .parquet/.arrow wymagają zainstalowanego pakietu pyarrow")
+
+
+def _arrow_type(column, series):
+    if column in TEXT_COLUMNS:
+        return pa.string()
+    if column in CATEGORY_COLUMNS:
+        return pa.dictionary(pa.int32(), pa.string())
+    if column in INT_COLUMNS:
+        return pa.int64()
+    if column in FLOAT_COLUMNS:
+        return pa.float64()
+    # Kolumny spoza schematu (np. dodatkowe kolumny pliku wejściowego scrapera) - typ z pierwszej paczki
+    if series.dtype == object or pd.api.types.is_string_dtype(series):
+        return pa.string()
+    return pa.array(series, from_pandas=True).type
+
+
+def apply_schema(df):
+    # Typy pandas odpowiadające schematowi: Int64 dla liczb całkowitych, float64 dla ocen, kategorie dla słowników
+    df = df.copy()
+    for column in df.columns:
+        if column in INT_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
+        elif column in FLOAT_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+        elif column in CATEGORY_COLUMNS:
+            df[column] = df[column].astype('category')
+    return df
+
+
+def _text(series):
+    # Wartości jako tekst (np. ISBN wczytany jako liczba), braki pozostają brakami
+    return series.astype(str).where(series.notna())
+
+
+class _DictionaryEncoder:
+    # Słownik rośnie tylko przez dopisywanie na końcu, więc kolejne paczki pliku Arrow IPC
+    # mogą zapisywać wyłącznie przyrosty słownika (dictionary deltas). Przyrost do pustego słownika
+    # nie jest dozwolony, dlatego dla Arrow IPC słownik zaczyna się od wartości zastępczej
+    def __init__(self, placeholder=None):
+        self.values = [] if placeholder is None else [placeholder]
+        self.index = {value: position for position, value in enumerate(self.values)}
+
+    def encode(self, series):
+        text = _text(series)
+        for value in pd.unique(text.dropna()):
+            if value not in self.index:
+                self.index[value] = len(self.values)
+                self.values.append(value)
+        codes = pa.array(text.map(self.index), type=pa.int32(), from_pandas=True)
+        return pa.DictionaryArray.from_arrays(codes, pa.array(self.values, type=pa.string()))
+
+
+class BookTableWriter:
+    def __init__(self, path):
+        _require_pyarrow()
+        self.path = path
+        self.rows_written = 0
+        self._schema = None
+        self._writer = None
+        self._encoders = {}
+        self._placeholder = None if path.lower().endswith('.parquet') else ''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _table(self, df):
+        if self._schema is None:
+            self._schema = pa.schema([(column, _arrow_type(column, df[column])) for column in df.columns])
+        arrays = []
+        for field in self._schema:
+            series = df[field.name]
+            if pa.types.is_dictionary(field.type):
+                encoder = self._encoders.setdefault(field.name, _DictionaryEncoder(self._placeholder))
+                arrays.append(encoder.encode(series))
+            elif pa.types.is_string(field.type):
+                arrays.append(pa.array(_text(series), type=pa.string(), from_pandas=True))
+            elif field.name in INT_COLUMNS or field.name in FLOAT_COLUMNS:
+                # Wartości liczbowe mogą przyjść jako tekst (np. ocena pobrana przez scraper)
+                arrays.append(pa.array(pd.to_numeric(series, errors='coerce'), type=field.type, from_pandas=True))
+            else:
+                arrays.append(pa.array(series, type=field.type, from_pandas=True))
+        return pa.Table.from_arrays(arrays, schema=self._schema)
+
+    def write(self, df):
+        table = self._table(df)
+        if self._writer is None:
+            if self.path.lower().endswith('.parquet'):
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                options = ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+                self._writer = ipc.new_file(self.path, self._schema, options=options)
+        self._writer.write_table(table)
+        self.rows_written += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def write_books(df, path):
+    with BookTableWriter(path) as writer:
+        writer.write(df)
+
+
+def _types_mapper(arrow_type):
+    # Liczby całkowite z brakami jako Int64 zamiast float64
+    if arrow_type == pa.int64():
+        return pd.Int64Dtype()
+    return None
+
+
+def _to_pandas(table):
+    df = table.to_pandas(types_mapper=_types_mapper)
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            # Bez wartości zastępczej słownika Arrow IPC i wartości spoza wczytanej paczki
+            df[column] = df[column].cat.remove_unused_categories()
+    return df
+
+
+def _columnar_schema(path):
+    if path.lower().endswith('.parquet'):
+        return pq.read_schema(path)
+    with pa.memory_map(path) as source:
+        return ipc.open_file(source).schema
+
+
+def read_books(path, columns=None, memory_map=True, **csv_kwargs):
+    # Wczytanie katalogu z CSV albo z pliku kolumnowego; columns ogranicza wczytywanie do potrzebnych kolumn
+    if not is_columnar(path):
+        if columns is not None:
+            csv_kwargs['usecols'] = lambda column: column in columns
+        return pd.read_csv(path, dtype={'isbn': str}, **csv_kwargs)
+
+    _require_pyarrow()
+    if columns is not None:
+        columns = [column for column in _columnar_schema(path).names if column in columns]
+    if path.lower().endswith('.parquet'):
+        table = pq.read_table(path, columns=columns, memory_map=memory_map)
+    else:
+        table = feather.read_table(path, columns=columns, memory_map=memory_map)
+    return _to_pandas(table)
+
+
+def iter_books(path, chunk_size, columns=None, **csv_kwargs):
+    # Wczytywanie paczkami - odpowiednik pd.read_csv(chunksize=...) dla wszystkich formatów
+    if not is_columnar(path):
+        if columns is not None:
+            csv_kwargs['usecols'] = lambda column: column in columns
+        yield from pd.read_csv(path, dtype={'isbn': str}, chunksize=chunk_size, **csv_kwargs)
+        return
+
+    _require_pyarrow()
+    if columns is not None:
+        columns = [column for column in _columnar_schema(path).names if column in columns]
+    if path.lower().endswith('.parquet'):
+        batches = pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunk_size, columns=columns)
+        for batch in batches:
+            yield _to_pandas(batch)
+    else:
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        for offset in range(0, table.num_rows, chunk_size):
+            yield _to_pandas(table.slice(offset, chunk_size))
@@ -0,0 +1,199 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Poziomy szczegółowości wypisów: QUIET - tylko podsumowania, NORMAL - także linia postępu,
+# VERBOSE - także komunikaty dla pojedynczych wierszy (ISBN, ostrzeżenia normalizacji, błędy zapytań)
+QUIET = 0
+NORMAL = 1
+VERBOSE = 2
+
+# Górne granice kubełków histogramu opóźnień w sekundach
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, summary):
+        for position, count in enumerate(summary["buckets"].values()):
+            self.counts[position] += count
+        self.count += summary["count"]
+        self.total += summary["total"]
+        self.max = max(self.max, summary["max"])
+
+    def quantile(self, q):
+        # Przybliżenie górną granicą kubełka, w którym leży kwantyl
+        threshold = q * self.count
+        seen = 0
+        for position, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= threshold:
+                return self.bounds[position] if position < len(self.bounds) else self.max
+        return None
+
+    def summary(self):
+        labels = [f"<={bound}" for bound in self.bounds] + ["inf"]
+        return {
+            "count": self.count,
+            "total": round(self.total, 6),
+            "mean": round(self.total / self.count, 6) if self.count else None,
+            "max": round(self.max, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip(labels, self.counts))
+        }
+
+
+class Metrics:
+    # Wspólne dla całego procesu liczniki, czasy etapów i histogramy opóźnień. Czasy etapów z kilku wątków
+    # się sumują (czas pracy, a nie czas zegarowy); etapy nie powinny być zagnieżdżone
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tool = None
+        self.verbosity = int(os.environ.get("BOOKS_VERBOSITY", NORMAL))
+        self.progress_interval = 5.0
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.timers = {}
+            self.counters = {}
+            self.histograms = {}
+            self._last_progress = 0.0
+            self._progress_started = None
+
+    def configure(self, tool=None, verbosity=None, progress_interval=None):
+        if tool is not None:
+            self.tool = tool
+        if verbosity is not None:
+            self.verbosity = verbosity
+        if progress_interval is not None:
+            self.progress_interval = progress_interval
+
+    # ---------------------
+    # Pomiary
+    def add_time(self, name, seconds, calls=1):
+        with self.lock:
+            timer = self.timers.setdefault(name, [0.0, 0])
+            timer[0] += seconds
+            timer[1] += calls
+
+    @contextmanager
+    def stage(self, name):
+        # Także jako dekorator: @metrics.stage("normalize")
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        with self.lock:
+            self.histograms.setdefault(name, Histogram()).observe(seconds)
+
+    @contextmanager
+    def latency(self, name, stage=None):
+        # Opóźnienie pojedynczej operacji (zapytanie, ładowanie strony) do histogramu i opcjonalnie do czasu etapu
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe(name, elapsed)
+            if stage:
+                self.add_time(stage, elapsed)
+
+    # ---------------------
+    # Wypisy
+    def enabled(self, level):
+        return self.verbosity >= level
+
+    def log(self, message, level=VERBOSE):
+        if self.verbosity >= level:
+            print(message)
+
+    def progress(self, done, total=None, label="", force=False):
+        # Jedna linia co progress_interval sekund zamiast komunikatu dla każdego wiersza
+        if self.verbosity < NORMAL:
+            return
+        now = time.monotonic()
+        with self.lock:
+            if self._progress_started is None:
+                self._progress_started = now
+            if not force and now - self._last_progress < self.progress_interval:
+                return
+            self._last_progress = now
+            elapsed = now - self._progress_started
+        rate = done / elapsed if elapsed > 0 else 0
+        line = f"[{self.tool or 'postęp'}] {label}: {done}"
+        if total:
+            line += f"/{total} ({100 * done / total:.1f}%)"
+            if rate and done < total:
+                line += f", pozostało ~{(total - done) / rate:.0f} s"
+        print(f"{line}, {rate:.0f}/s")
+
+    # ---------------------
+    # Raport
+    def snapshot(self):
+        with self.lock:
+            return {
+                "timers": {name: list(timer) for name, timer in self.timers.items()},
+                "counters": dict(self.counters),
+                "histograms": {name: histogram.summary() for name, histogram in self.histograms.items()}
+            }
+
+    def merge(self, snapshot):
+        # Wyniki z procesu roboczego (np. puli DBMerger)
+        for name, (seconds, calls) in snapshot["timers"].items():
+            self.add_time(name, seconds, calls)
+        for name, value in snapshot["counters"].items():
+            self.count(name, value)
+        with self.lock:
+            for name, summary in snapshot["histograms"].items():
+                self.histograms.setdefault(name, Histogram()).merge(summary)
+
+    def report(self):
+        wall = time.time() - self.started
+        snapshot = self.snapshot()
+        return {
+            "tool": self.tool,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "wall_seconds": round(wall, 3),
+            "stages": {name: {"seconds": round(seconds, 3), "calls": calls,
+                              "share_of_wall": round(seconds / wall, 3) if wall > 0 else None}
+                       for name, (seconds, calls) in sorted(snapshot["timers"].items(), key=lambda item: -item[1][0])},
+            "counters": snapshot["counters"],
+            "histograms": snapshot["histograms"]
+        }
+
+    def write_report(self, path):
+        report = self.report()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        stages = ", ".join(f"{name} {stage['seconds']:.2f} s" for name, stage in report["stages"].items())
+        print(f"Raport z przebiegu: {path} ({stages})")
+        return report
+
+
+metrics = Metrics()